@@ -0,0 +1,328 @@
+"""
+Reproducible benchmarks for the render hot paths.
+
+Synthetic covers are generated for common KDP trim sizes (paperback and
+hardcover, thin and thick spines) and rendered with a fixed font so runs are
+comparable across machines and commits. Timed stages:
+
+  - cold start:    importing the rendering stack in a fresh interpreter
+  - render_text:   title, subtitle, description and spine blocks
+  - helpers:       each CoverLayoutEngine helper on its own
+  - end to end:    engine load + add_text + save
+  - variant:       add_text + save over a prepared background plan
+  - preview:       end to end at config.PREVIEW_DPI with the fast blur
+
+Results are written as JSON; pass --baseline to print the change against a
+previous run. --golden-dir stores reference renders (--update-golden) or
+compares against them, so an optimized path can be checked for visual
+equivalence (e.g. --compositor cairo against goldens made with pil).
+
+    python benchmarks/bench_render.py --out bench.json
+    python benchmarks/bench_render.py --golden-dir goldens --update-golden
+    python benchmarks/bench_render.py --compositor cairo --golden-dir goldens --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cover_engine")
+sys.path.insert(0, ENGINE_DIR)
+
+from PIL import Image, ImageChops, ImageDraw, ImageStat  # noqa: E402
+
+import config  # noqa: E402
+from geometry import safe_zones, text_boxes  # noqa: E402
+from layout_engine import CoverLayoutEngine  # noqa: E402
+from text_renderer import render_text  # noqa: E402
+
+FONT = "DejaVu Serif"
+TITLE = "Zen Garden Bliss: A Mindful Coloring Journey"
+DESCRIPTION = ("Escape into a serene world of art and mindfulness with 50 beautiful designs. "
+               "Each page is printed single-sided on bright paper, with calming patterns "
+               "for every skill level.")
+AUTHOR = "FBN Publishing"
+
+# Golden checks: a pixel counts as changed when a channel moves by more than
+# PIXEL_THRESHOLD, and a render fails once more than MAX_CHANGED_SHARE of its
+# pixels changed (0.05% of a 5175x3375 wrap is ~8,700 px, well under a spine line)
+PIXEL_THRESHOLD = 64
+MAX_CHANGED_SHARE = 0.0005
+
+# name, trim width/height (in), bleed (in), page count, paper
+CASES = [
+    ("paperback_8.5x11_thin", 8.5, 11, config.BLEED_INCH, 24, "white"),
+    ("paperback_8.5x11_thick", 8.5, 11, config.BLEED_INCH, 300, "white"),
+    ("paperback_6x9_thick", 6, 9, config.BLEED_INCH, 300, "cream"),
+    ("paperback_8.5x8.5_thin", 8.5, 8.5, config.BLEED_INCH, 48, "color"),
+    # KDP hardcover wraps add ~0.51 in on every edge (bleed + board wrap)
+    ("hardcover_8.25x11_thick", 8.25, 11, 0.51, 300, "white"),
+]
+
+
+def case_geometry(trim_w, trim_h, bleed, pages, paper, dpi=config.DPI):
+    """Full cover width/height and spine width in px."""
+    spine_in = pages * config.SPINE_INCH_PER_PAGE[paper]
+    width = round((2 * trim_w + spine_in + 2 * bleed) * dpi)
+    height = round((trim_h + 2 * bleed) * dpi)
+    return width, height, round(spine_in * dpi)
+
+
+def synthetic_cover(path, width, height, seed=0):
+    """Deterministic busy artwork: gradient background plus random shapes."""
+    rng = random.Random(seed)
+    img = Image.merge("RGB", [
+        Image.linear_gradient("L").resize((width, height)),
+        Image.radial_gradient("L").resize((width, height)),
+        Image.linear_gradient("L").rotate(90).resize((width, height)),
+    ])
+    draw = ImageDraw.Draw(img)
+    for _ in range(120):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(20, max(21, width // 12))
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x - r, y - r, x + r, y + r), outline=color, width=rng.randrange(2, 12))
+    img.save(path)
+
+
+def timed(fn, repeat):
+    """Run fn `repeat` times; return (min, median) seconds and the last result."""
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {"min": round(min(times), 5), "median": round(statistics.median(times), 5)}, result
+
+
+def cold_start(repeat):
+    code = "import text_renderer, layout_engine"
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ENGINE_DIR, check=True)
+        times.append(time.perf_counter() - start)
+    return {"min": round(min(times), 5), "median": round(statistics.median(times), 5)}
+
+
+def bench_render_text(width, height, spine_width, repeat):
+    """Time each text block with the box sizes add_text uses at 300 DPI."""
+    boxes = text_boxes(safe_zones(width, height, spine_width))
+    spine_h, spine_w = boxes["spine"]
+    blocks = {
+        "title": dict(text="Zen Garden Bliss", font_size=96, box_size=boxes["title"],
+                      align="center", valign="middle", bold=True, add_bg=True,
+                      letter_spacing=1.2, padding_px=18),
+        "subtitle": dict(text="A Mindful Coloring Journey", font_size=41,
+                         box_size=boxes["subtitle"], align="center",
+                         letter_spacing=0.96, rounded_bg=False, padding_px=8),
+        "description": dict(text=DESCRIPTION, font_size=48, box_size=boxes["desc"],
+                            spacing=10, add_bg=True, justify=True, padding_px=16),
+        "spine": dict(text=f"Zen Garden Bliss • {AUTHOR}", font_size=64,
+                      box_size=(spine_h, max(1, spine_w)),
+                      align="center", valign="middle", rotated=True, small_caps=True,
+                      letter_spacing=1.6),
+    }
+    results = {}
+    for name, kw in blocks.items():
+        kw = dict(kw)
+        text, size, box = kw.pop("text"), kw.pop("font_size"), kw.pop("box_size")
+        results[name], _ = timed(lambda: render_text(text, FONT, size, (0, 0, 0), box, **kw), repeat)
+    return results
+
+
+def bench_helpers(cover_path, width, height, spine_width, repeat):
+    engine = CoverLayoutEngine(cover_path, width, height, spine_width)
+    box_w, box_h = width // 3, height // 3
+    results = {}
+    results["_add_gradient_bar"], _ = timed(
+        lambda: engine._add_gradient_bar((100, 100, 100 + box_w, 100 + box_h)), repeat)
+    results["_blur_area"], _ = timed(lambda: engine._blur_area(100, 100, box_w, box_h), repeat)
+    results["_extract_dominant_color"], _ = timed(engine._extract_dominant_color, repeat)
+    results["_draw_line"], _ = timed(
+        lambda: engine._draw_line(100, 200, 100 + box_w, (20, 20, 20), thickness=5), repeat)
+    return results
+
+
+def _add_text(engine):
+    engine.add_text(
+        title=TITLE, description=DESCRIPTION, author=AUTHOR, font_family=FONT,
+        title_font_size=96, desc_font_size=48, spine_font_size=64,
+        title_color=(0, 0, 0), desc_color=(51, 51, 51), line_spacing=10, body_font=FONT,
+    )
+
+
+def render_cover(cover_path, out_path, width, height, spine_width, compositor, **engine_kwargs):
+    engine = CoverLayoutEngine(cover_path, width, height, spine_width, compositor=compositor, **engine_kwargs)
+    _add_text(engine)
+    engine.save(out_path)
+    return out_path
+
+
+def bench_variant(cover_path, out_path, width, height, spine_width, compositor, repeat):
+    """Time one text variant rendered over a background plan prepared once."""
+    engine = CoverLayoutEngine(cover_path, width, height, spine_width, compositor=compositor)
+    engine.prepare_background()
+
+    def variant():
+        engine.restore_background()
+        _add_text(engine)
+        engine.save(out_path)
+
+    result, _ = timed(variant, repeat)
+    return result
+
+
+def compare_images(a_path, b_path, pixel_threshold=PIXEL_THRESHOLD):
+    """
+    Mean and max absolute per-channel difference between two renders, and the
+    share of pixels where some channel differs by more than pixel_threshold.
+    A missing block barely moves the mean over a full wrap, but shows up in
+    changed_share; antialiasing differences stay under the threshold.
+    """
+    a = Image.open(a_path).convert("RGB")
+    b = Image.open(b_path).convert("RGB")
+    if a.size != b.size:
+        return {"equal_size": False, "mean_diff": None, "max_diff": None, "changed_share": None}
+    diff = ImageChops.difference(a, b)
+    red, green, blue = diff.split()
+    worst = ImageChops.lighter(ImageChops.lighter(red, green), blue)  # per-pixel max channel difference
+    changed = sum(worst.histogram()[pixel_threshold + 1:])
+    return {
+        "equal_size": True,
+        "mean_diff": round(sum(ImageStat.Stat(diff).mean) / 3, 4),
+        "max_diff": max(hi for _lo, hi in diff.getextrema()),
+        "changed_share": round(changed / (a.width * a.height), 6),
+    }
+
+
+def golden_mismatch(comparison, tolerance, max_changed):
+    """Why a render does not match its golden, or None when it does."""
+    if not comparison["equal_size"]:
+        return "size differs"
+    if comparison["mean_diff"] > tolerance:
+        return f"mean difference {comparison['mean_diff']} > {tolerance}"
+    if comparison["changed_share"] > max_changed:
+        return f"{comparison['changed_share']:.4%} of pixels changed > {max_changed:.4%}"
+    return None
+
+
+def run(args):
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pillow": Image.__version__,
+            "font": FONT,
+            "compositor": args.compositor,
+            "repeat": args.repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "cold_start": cold_start(args.repeat),
+        "cases": {},
+    }
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, trim_w, trim_h, bleed, pages, paper in CASES:
+            if args.cases and name not in args.cases:
+                continue
+            width, height, spine_width = case_geometry(trim_w, trim_h, bleed, pages, paper)
+            cover_path = os.path.join(tmp, f"{name}_art.png")
+            synthetic_cover(cover_path, width, height)
+            out_path = os.path.join(tmp, f"{name}.png")
+
+            case = {"size": [width, height], "spine_width": spine_width}
+            case["render_text"] = bench_render_text(width, height, spine_width, args.repeat)
+            case["helpers"] = bench_helpers(cover_path, width, height, spine_width, args.repeat)
+            case["end_to_end"], _ = timed(
+                lambda: render_cover(cover_path, out_path, width, height, spine_width, args.compositor),
+                args.repeat)
+            case["variant"] = bench_variant(
+                cover_path, os.path.join(tmp, f"{name}_variant.png"), width, height, spine_width,
+                args.compositor, args.repeat)
+            case["preview"], _ = timed(
+                lambda: render_cover(cover_path, os.path.join(tmp, f"{name}_preview.png"), width, height,
+                                     spine_width, args.compositor, preview_dpi=config.PREVIEW_DPI),
+                args.repeat)
+
+            if args.golden_dir:
+                golden = os.path.join(args.golden_dir, f"{name}.png")
+                if args.update_golden:
+                    os.makedirs(args.golden_dir, exist_ok=True)
+                    Image.open(out_path).save(golden)
+                    case["golden"] = "updated"
+                elif os.path.exists(golden):
+                    case["golden"] = compare_images(golden, out_path, args.pixel_threshold)
+                    mismatch = golden_mismatch(case["golden"], args.tolerance, args.max_changed)
+                    if mismatch:
+                        case["golden"]["mismatch"] = mismatch
+                        failures.append(name)
+                else:
+                    case["golden"] = "missing"
+
+            results["cases"][name] = case
+            print(f"   ✔ {name}: end to end {case['end_to_end']['median']}s", file=sys.stderr)
+
+    results["golden_failures"] = failures
+    return results
+
+
+def _flatten(prefix, node, out):
+    if isinstance(node, dict) and "median" in node:
+        out[prefix] = node["median"]
+    elif isinstance(node, dict):
+        for key, value in node.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, value, out)
+    return out
+
+
+def print_comparison(baseline, current):
+    """Print median timings of both runs with the relative change."""
+    old, new = _flatten("", baseline, {}), _flatten("", current, {})
+    for key in sorted(new):
+        if key.startswith("meta") or key not in old:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        print(f"{key:70s} {old[key]:9.4f}s -> {new[key]:9.4f}s  {change:+6.1f}%", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FBNP cover engine benchmarks")
+    parser.add_argument("--out", type=str, default=None, help="Write results JSON here (default: stdout)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    parser.add_argument("--cases", nargs="+", default=None, choices=[c[0] for c in CASES])
+    parser.add_argument("--compositor", type=str, default="pil", choices=["pil", "cairo"])
+    parser.add_argument("--baseline", type=str, default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--golden-dir", type=str, default=None, help="Directory of reference renders")
+    parser.add_argument("--update-golden", action="store_true", help="Overwrite the reference renders")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="Max mean per-channel difference (0-255) against a golden image")
+    parser.add_argument("--pixel-threshold", type=int, default=PIXEL_THRESHOLD,
+                        help="Channel difference (0-255) above which a pixel counts as changed")
+    parser.add_argument("--max-changed", type=float, default=MAX_CHANGED_SHARE,
+                        help="Max share of changed pixels against a golden image")
+    args = parser.parse_args()
+
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+    if results["golden_failures"]:
+        sys.exit(f"❌ Golden mismatch: {', '.join(results['golden_failures'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+asyncio API: render covers without blocking the event loop.
+
+    from async_render import AsyncRenderer
+
+    async with AsyncRenderer(max_in_flight=4, memory_budget_mb=4096) as renderer:
+        result = await renderer.render_cover(job, timeout=120)
+        async for result in renderer.render_many(jobs, timeout=120):
+            print(result["index"], result["status"])
+
+Jobs are the same dicts as manifest rows (see jobs.py) and are validated on
+the loop before anything is queued. Renders run on a managed process pool
+(executor="process", the default) or thread pool (executor="thread"); each
+worker resolves fonts once and renders exactly like a batch worker, so the
+render cache, layout templates and profiling all apply. Result records are
+the ones run_batch produces. Peak RSS is tracked per process, so with
+threads a job's peak_rss_mb covers every render running at the same time.
+
+Admission is bounded: at most max_in_flight jobs are handed to the pool at a
+time, and with memory_budget_mb only as many as fit the budget by
+estimate_job_mb() (one job is always admitted, however large). Hundreds of
+pending jobs therefore wait as cheap coroutines. Cancelling a job or hitting
+its timeout drops it from the queue; a render that already started cannot be
+interrupted, so it finishes in the background and keeps its share of the
+budget until it does.
+"""
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from batch import _init_worker, render_one
+from config import DPI
+from jobs import normalize_job
+from validation import check_job
+
+EXECUTORS = ("thread", "process")
+JOB_OVERHEAD_MB = 50  # Pango/cairo state, text surfaces and encoder buffers
+COVER_COPIES = 3      # full-size copies alive at the peak: cover, blurred panels / overlay, encode
+
+
+def estimate_job_mb(job: dict):
+    """Rough peak memory of rendering a normalized job, in MB."""
+    scale = (job["preview_dpi"] or DPI) / DPI
+    pixels = job["width"] * job["height"] * scale * scale
+    channels = 3 if job["low_memory"] else 4
+    return JOB_OVERHEAD_MB + pixels * channels * COVER_COPIES / (1024 * 1024)
+
+
+class _Admission:
+    """First-come, first-served gate on the number and estimated memory of running jobs."""
+
+    def __init__(self, max_in_flight: int, budget_mb=None):
+        self.max_in_flight = max_in_flight
+        self.budget_mb = budget_mb
+        self.in_flight = 0
+        self.reserved_mb = 0.0
+        self._waiters = deque()  # (future, mb), in arrival order
+
+    def _fits(self, mb):
+        if self.in_flight >= self.max_in_flight:
+            return False
+        return self.budget_mb is None or self.in_flight == 0 or self.reserved_mb + mb <= self.budget_mb
+
+    def _take(self, mb):
+        self.in_flight += 1
+        self.reserved_mb += mb
+
+    def _wake(self):
+        while self._waiters:
+            future, mb = self._waiters[0]
+            if future.done():  # cancelled while waiting
+                self._waiters.popleft()
+                continue
+            if not self._fits(mb):
+                break  # no overtaking, so a large job is not starved by small ones
+            self._waiters.popleft()
+            self._take(mb)
+            future.set_result(None)
+
+    async def acquire(self, mb):
+        if not self._waiters and self._fits(mb):
+            self._take(mb)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((future, mb))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(mb)  # admitted just as it was cancelled
+            else:
+                self._wake()
+            raise
+
+    def release(self, mb):
+        self.in_flight -= 1
+        self.reserved_mb -= mb
+        self._wake()
+
+
+class AsyncRenderer:
+    """
+    Bounded, cancellable cover rendering for asyncio applications.
+
+    executor:         "process" (default) or "thread" (no worker start-up, and
+                      PIL, cairo and Pango release the GIL for much of a
+                      render, but peak_rss_mb is shared by concurrent renders)
+    workers:          pool size (default: max_in_flight, else CPU count)
+    max_in_flight:    jobs handed to the pool at once (default: workers)
+    memory_budget_mb: cap on the summed estimate_job_mb() of running jobs
+    """
+
+    def __init__(self, executor="process", workers=None, max_in_flight=None, memory_budget_mb=None):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}' (use one of {EXECUTORS}).")
+        workers = workers or max_in_flight or os.cpu_count() or 1
+        if executor == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=workers, initializer=_init_worker)
+        else:
+            # Forking a process that already runs threads (the loop's, the encode pool) can deadlock
+            self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        self._admission = _Admission(max_in_flight or workers, memory_budget_mb)
+        self.workers = workers
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Drop queued renders and wait for running ones without blocking the loop."""
+        shutdown = partial(self._executor.shutdown, wait=True, cancel_futures=True)
+        await asyncio.get_running_loop().run_in_executor(None, shutdown)
+
+    @property
+    def in_flight(self):
+        return self._admission.in_flight
+
+    async def render_cover(self, job: dict, timeout=None, index=0):
+        """
+        Render one job (a raw manifest-style dict) and return its result record;
+        a render that fails is reported with status "failed", as in batch mode.
+
+        Raises ValueError if the job is invalid, asyncio.TimeoutError if it is
+        not finished within `timeout` seconds (queueing included) and
+        CancelledError if the awaiting task is cancelled.
+        """
+        report = check_job(job)
+        if not report["valid"]:
+            raise ValueError(" ".join(report["errors"]))
+        job = normalize_job(job)
+        return await asyncio.wait_for(self._run(job, index), timeout)
+
+    async def _run(self, job: dict, index: int):
+        loop = asyncio.get_running_loop()
+        mb = estimate_job_mb(job)
+        await self._admission.acquire(mb)
+        try:
+            future = self._executor.submit(render_one, job, index)
+        except BaseException:
+            self._admission.release(mb)
+            raise
+
+        def _done(_future):
+            # The pool slot (and memory) is only free once the worker is, even after a timeout
+            try:
+                loop.call_soon_threadsafe(self._admission.release, mb)
+            except RuntimeError:
+                pass  # loop already closed
+
+        future.add_done_callback(_done)
+        return await asyncio.wrap_future(future)
+
+    async def render_many(self, jobs, timeout=None):
+        """
+        Render every job and yield one result record per job in completion
+        order (each carries its "index" in `jobs`). Invalid, failed, timed-out
+        and cancelled jobs are reported by status and never stop the rest;
+        leaving the loop early cancels the jobs still pending.
+        """
+        tasks = {}
+        for index, job in enumerate(jobs):
+            output = job.get("output") if isinstance(job, dict) else None
+            task = asyncio.ensure_future(self.render_cover(job, timeout, index))
+            tasks[task] = (index, output)
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: tasks[t][0]):
+                    yield self._record(task, *tasks[task], timeout)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _record(task, index, output, timeout):
+        if task.cancelled():
+            return {"index": index, "output": output, "status": "cancelled", "error": None}
+        error = task.exception()
+        if error is None:
+            return task.result()
+        if isinstance(error, asyncio.TimeoutError):
+            return {"index": index, "output": output, "status": "timeout",
+                    "error": f"Not finished within {timeout}s."}
+        if isinstance(error, ValueError):
+            return {"index": index, "output": output, "status": "invalid", "error": str(error)}
+        return {"index": index, "output": output, "status": "failed", "error": f"{type(error).__name__}: {error}"}
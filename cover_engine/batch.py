@@ -0,0 +1,302 @@
+"""
+Batch rendering of a manifest of cover jobs across a pool of worker processes.
+
+Manifest formats:
+  - JSONL: one JSON object per line
+  - CSV:   header row with the job field names
+
+Each worker picks and verifies fonts once, then renders chunks of jobs until
+the manifest is exhausted, encoding each cover in the background while the
+next one renders. Covers of the same size share one layout template per
+worker (geometry and gradient masks, see layout_template.py). Jobs naming a
+render_cache are looked up there first (see render_cache.py); hits are
+copied instead of rendered. A failing job is recorded in the summary and
+never stops the rest of the run.
+"""
+import csv
+import json
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from jobs import normalize_job, pick_fonts, render_job, write_job_profile, open_render_cache
+from layout_template import LayoutTemplate, load_template
+from validation import check_job
+
+# Fonts resolved once per worker process (see _init_worker)
+_FONTS = None
+# Render caches opened by this worker, by (directory, size cap)
+_CACHES = {}
+# Layout templates used by this worker, by (width, height, spine_width)
+_TEMPLATES = {}
+
+
+def load_manifest(path: str):
+    """
+    Read a JSONL or CSV manifest into a list of raw job dicts.
+    Lines that are not valid JSON are kept as {"_error": ...} so they show up
+    as invalid jobs instead of aborting the run.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if ext == ".csv":
+            for row in csv.DictReader(f):
+                rows.append({k.strip(): v for k, v in row.items() if k})
+        else:
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError as e:
+                    obj = {"_error": f"❌ ERROR: Line {lineno} is not valid JSON ({e.msg})."}
+                if not isinstance(obj, dict):
+                    obj = {"_error": f"❌ ERROR: Line {lineno} is not a JSON object."}
+                rows.append(obj)
+    return rows
+
+
+def prepare_jobs(rows):
+    """
+    Normalize and validate every row up front (see validation.check_job).
+    Returns a list of (index, job_or_None, error_or_None).
+    """
+    prepared = []
+    for index, raw in enumerate(rows):
+        if "_error" in raw:
+            prepared.append((index, None, raw["_error"]))
+            continue
+        report = check_job(raw)
+        if not report["valid"]:
+            prepared.append((index, None, " ".join(report["errors"])))
+            continue
+        prepared.append((index, normalize_job(raw), None))
+    return prepared
+
+
+def _init_worker():
+    global _FONTS
+    _FONTS = pick_fonts()
+
+
+def _render_cache(job):
+    """This worker's RenderCache for the job, or None when it names no cache."""
+    if not job["render_cache"]:
+        return None
+    cache_id = (job["render_cache"], job["render_cache_mb"])
+    if cache_id not in _CACHES:
+        _CACHES[cache_id] = open_render_cache(job)
+    return _CACHES[cache_id]
+
+
+def _layout_template(job):
+    """This worker's LayoutTemplate for the job's size: the job's template file, or built once."""
+    size = (job["width"], job["height"], job["spine_width"])
+    if size not in _TEMPLATES:
+        _TEMPLATES[size] = load_template(job["template"]) if job["template"] else LayoutTemplate(*size)
+    return _TEMPLATES[size]
+
+
+def _finish(result, job, engine, cache_key=None, overlapped=False):
+    """
+    Wait for a job's background encode and complete its result record.
+
+    seconds is the job's own time: its render plus this wait, never the
+    render of the job that overlapped its encode. peak_rss_mb was taken when
+    the render ended; it only grows by the encode when nothing else has
+    rendered since (overlapped=False), as the next engine resets the mark.
+    """
+    finish = time.perf_counter()
+    if engine is not None:
+        try:
+            engine.wait_saved()
+            result["encode_wait_seconds"] = round(time.perf_counter() - finish, 4)
+            if not overlapped:
+                result["peak_rss_mb"] = engine.peak_rss_mb
+            result["profile"] = write_job_profile(job, engine)
+            if cache_key:
+                _render_cache(job).store(cache_key, job["output"])
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(result["render_seconds"] + time.perf_counter() - finish, 4)
+    return result
+
+
+def _run_chunk(items):
+    """
+    Render a chunk of (index, job) pairs in order. Each cover is encoded on a
+    background thread while the next one renders, so the last encode is the
+    only one the worker waits for.
+    """
+    results = []
+    pending = None
+    for index, job in items:
+        start = time.perf_counter()
+        result = {"index": index, "output": job["output"], "status": "ok", "error": None,
+                  "peak_rss_mb": None, "cache": None, "encode_wait_seconds": 0.0}
+        engine = None
+        cache_key = None
+        try:
+            cache = _render_cache(job)
+            if cache is not None:
+                cache_key = cache.key(job, *_FONTS)
+                result["cache"] = "hit" if cache.fetch(cache_key, job["output"]) else "miss"
+            if result["cache"] != "hit":
+                engine = render_job(job, *_FONTS, background=True, template=_layout_template(job))
+                result["peak_rss_mb"] = engine.peak_rss_mb
+        except Exception as e:  # one bad cover must not kill the batch
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["render_seconds"] = round(time.perf_counter() - start, 4)
+        if pending:
+            results.append(_finish(*pending, overlapped=engine is not None))
+        pending = (result, job, engine, cache_key)
+    if pending:
+        results.append(_finish(*pending))
+    return results
+
+
+def render_one(job, index=0):
+    """
+    Render one normalized, validated job in this process and return its
+    result record (see run_batch). Fonts come from _init_worker(), which
+    must have run in this process (or thread) first.
+    """
+    return _run_chunk([(index, job)])[0]
+
+
+def _failed_result(index, job, error):
+    return {"index": index, "output": job["output"], "status": "failed", "error": error,
+            "peak_rss_mb": None, "cache": None, "seconds": 0.0}
+
+
+def _run_pool(chunks, workers, collect):
+    """
+    Render chunks on a pool of worker processes, passing each result to
+    collect(). Returns the (index, job) pairs of chunks lost because a worker
+    died (OOM kill, crash in cairo/Pango): that breaks the whole pool and
+    every chunk still queued on it.
+    """
+    lost = []
+    with ProcessPoolExecutor(min(workers, len(chunks)), initializer=_init_worker) as pool:
+        futures = {pool.submit(_run_chunk, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                chunk_results = future.result()
+            except BrokenProcessPool:
+                lost.extend(futures[future])
+                continue
+            except Exception as e:  # e.g. a result that cannot be pickled back
+                chunk_results = [_failed_result(index, job, f"{type(e).__name__}: {e}")
+                                 for index, job in futures[future]]
+            for result in chunk_results:
+                collect(result)
+    return lost
+
+
+def _rerun_isolated(items, workers, collect):
+    """
+    Re-render jobs lost to a dead worker, each on its own in a single-worker
+    pool (up to `workers` such pools at once), so a job that kills its worker
+    again is recorded as failed without taking any other job with it.
+    """
+    pending = deque(items)
+    lock = threading.Lock()
+    spawn = multiprocessing.get_context("spawn")  # these pools are started from threads
+
+    def _drain():
+        pool = None
+        try:
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    index, job = pending.popleft()
+                if pool is None:
+                    pool = ProcessPoolExecutor(1, mp_context=spawn, initializer=_init_worker)
+                try:
+                    chunk_results = pool.submit(_run_chunk, [(index, job)]).result()
+                except BrokenProcessPool:
+                    pool.shutdown(wait=False)
+                    pool = None
+                    chunk_results = [_failed_result(index, job, "Worker process died while rendering this job "
+                                                                "(killed, out of memory or crashed).")]
+                with lock:
+                    for result in chunk_results:
+                        collect(result)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    with ThreadPoolExecutor(min(workers, len(items))) as threads:
+        for drain in [threads.submit(_drain) for _ in range(min(workers, len(items)))]:
+            drain.result()
+
+
+def run_batch(rows, workers=None, on_result=None, chunk_size=4):
+    """
+    Render all valid jobs in `rows` and return a summary dict.
+
+    workers:    number of worker processes (default: CPU count); 1 renders in-process.
+                Jobs lost when a worker dies are re-run one per process, and a
+                job that kills its worker again is recorded as failed
+    on_result:  optional callback invoked with each job result as it completes
+    chunk_size: most jobs handed to a worker at a time (encodes overlap within
+                a chunk); smaller when needed to give every worker a chunk
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    start = time.perf_counter()
+
+    results = []
+    runnable = []
+    for index, job, error in prepare_jobs(rows):
+        if job is None:
+            output = rows[index].get("output") if isinstance(rows[index], dict) else None
+            results.append({"index": index, "output": output, "status": "invalid",
+                            "error": error, "seconds": 0.0})
+        else:
+            runnable.append((index, job))
+
+    def _collect(result):
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    chunk_size = max(1, min(chunk_size, math.ceil(len(runnable) / workers)))
+    chunks = [runnable[i:i + chunk_size] for i in range(0, len(runnable), chunk_size)]
+    if chunks:
+        if workers == 1:
+            _init_worker()
+            for chunk in chunks:
+                for result in _run_chunk(chunk):
+                    _collect(result)
+        else:
+            lost = _run_pool(chunks, workers, _collect)
+            if lost:
+                _rerun_isolated(lost, workers, _collect)
+
+    results.sort(key=lambda r: r["index"])
+    return {
+        "workers": workers,
+        "total": len(rows),
+        "succeeded": sum(r["status"] == "ok" for r in results),
+        "failed": sum(r["status"] == "failed" for r in results),
+        "invalid": sum(r["status"] == "invalid" for r in results),
+        "seconds": round(time.perf_counter() - start, 4),
+        "max_peak_rss_mb": max((r.get("peak_rss_mb") or 0 for r in results), default=0),
+        "cache_hits": sum(r.get("cache") == "hit" for r in results),
+        "cache_misses": sum(r.get("cache") == "miss" for r in results),
+        "jobs": results,
+    }
+
+
+def write_summary(summary: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
@@ -1,7 +1,65 @@
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# Memoized palettes keyed by a content hash of the analysed image
+_PALETTE_CACHE = OrderedDict()
+_PALETTE_CACHE_SIZE = 64
+_PALETTE_LOCK = threading.Lock()  # engines on several threads share the cache
+
+
+def luminance(color):
+    """Perceived brightness (0-255) of an RGB(A) color."""
+    r, g, b = color[:3]
+    return (r * 299 + g * 587 + b * 114) / 1000
+
+
 def get_contrast_color(bg_color):
     """
     Returns a contrasting text color (black or white) for a given background color.
     """
-    r, g, b = bg_color
-    brightness = (r * 299 + g * 587 + b * 114) / 1000
+    brightness = luminance(bg_color)
     return (0, 0, 0) if brightness > 128 else (255, 255, 255)
+
+
+def extract_palette(image, colors=12, sample_size=120, kmeans=0, cache_key=None):
+    """
+    Return the image's dominant colors as [(rgb, share), ...], most common first.
+
+    The image is downsampled to `sample_size` square and quantized with PIL's
+    median-cut (optionally refined by `kmeans` k-means passes), so near-identical
+    shades are bucketed together instead of counted as separate pixels.
+    When `cache_key` (e.g. a content hash of the source art) is given, the
+    result is memoized and repeated calls skip the analysis.
+    """
+    key = (cache_key, colors, sample_size, kmeans) if cache_key else None
+    if key:
+        with _PALETTE_LOCK:
+            if key in _PALETTE_CACHE:
+                _PALETTE_CACHE.move_to_end(key)
+                return _PALETTE_CACHE[key]
+
+    small = image.resize((sample_size, sample_size), Image.BILINEAR, reducing_gap=2.0).convert("RGB")
+    quantized = small.quantize(colors=colors, method=Image.Quantize.MEDIANCUT, kmeans=kmeans)
+    flat = quantized.getpalette()
+    total = sample_size * sample_size
+
+    palette = [
+        (tuple(flat[i * 3:i * 3 + 3]), count / total)
+        for count, i in sorted(quantized.getcolors(colors), reverse=True)
+    ]
+
+    if key:
+        with _PALETTE_LOCK:
+            _PALETTE_CACHE[key] = palette
+            if len(_PALETTE_CACHE) > _PALETTE_CACHE_SIZE:
+                _PALETTE_CACHE.popitem(last=False)
+    return palette
+
+
+def pick_accent_color(palette, max_luminance=226, default=(45, 45, 45)):
+    """First palette color that is not near-white, else `default`."""
+    for color, _share in palette:
+        if luminance(color) < max_luminance:
+            return color
+    return default
@@ -1,5 +1,6 @@
 # Configuration for fonts, DPI, and layout rules
 DPI = 300
+PREVIEW_DPI = 96  # proofs (--preview)
 BLEED_INCH = 0.125
 TRIM_WIDTH_INCH = 8.5
 TRIM_HEIGHT_INCH = 11
@@ -9,5 +10,16 @@ TITLE_FONT = "assets/fonts/Merriweather-Bold.ttf"
 DESC_FONT = "assets/fonts/OpenSans-Regular.ttf"
 SPINE_FONT = "assets/fonts/Merriweather-Regular.ttf"
 
+# Render options
+COMPOSITORS = ("pil", "cairo")
+BLUR_MODES = ("gaussian", "fast")  # see image_utils.blur_image
+
 # Safe zones
 SAFE_MARGIN_INCH = 0.25
+
+# Spine thickness per page, by KDP paper type
+SPINE_INCH_PER_PAGE = {
+    "white": 0.002252,
+    "cream": 0.0025,
+    "color": 0.002347,
+}
@@ -1,92 +1,189 @@
 import argparse
+import json
 import sys
-from layout_engine import CoverLayoutEngine
-from text_renderer import verify_font_available
+import time
+from jobs import (
+    TITLE_MAX_CHARS, SUBTITLE_MAX_CHARS, DESC_MAX_CHARS, SPINE_MAX_CHARS,  # noqa: F401 (n8n reads these)
+    PRO_TITLE_FONTS, PRO_BODY_FONTS,  # noqa: F401
+    JOB_DEFAULTS, REQUIRED_FIELDS, TEMPLATE_FIELDS,
+    pick_font, pick_fonts, split_title_subtitle, hex_to_rgb, validate_job,  # noqa: F401
+    normalize_job, render_job, render_variants, profile_path, open_render_cache,
+)
+from output_profiles import OUTPUT_PROFILES
+from config import PREVIEW_DPI
+from profiler import StageProfiler, stage
+
+
+def run_validate(args, raw):
+    """Print a JSON validation report (one per manifest row) and exit 1 if anything is invalid."""
+    from validation import check_job
+
+    if args.manifest:
+        from batch import load_manifest
+
+        reports = []
+        for index, row in enumerate(load_manifest(args.manifest)):
+            if "_error" in row:
+                report = {"valid": False, "errors": [row["_error"]], "warnings": []}
+            else:
+                report = check_job(row, check_fit=args.check_fit)
+            reports.append({"index": index, **report})
+        result = {"valid": all(r["valid"] for r in reports), "jobs": reports}
+    else:
+        result = check_job(raw, check_fit=args.check_fit)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    sys.exit(0 if result["valid"] else 1)
+
+
+def run_manifest(args):
+    from batch import load_manifest, run_batch, write_summary
+
+    rows = load_manifest(args.manifest)
+    if args.render_cache:  # default for rows that do not name their own cache
+        for row in rows:
+            row.setdefault("render_cache", args.render_cache)
+            row.setdefault("render_cache_mb", args.render_cache_mb)
+    if args.template:  # likewise for a series sharing one trim
+        for row in rows:
+            row.setdefault("template", args.template)
+    print(f"📦 Batch: {len(rows)} job(s) from {args.manifest}")
+
+    def report(result):
+        mark = "✔" if result["status"] == "ok" else "✘"
+        rss = f", {result['peak_rss_mb']} MB" if result.get("peak_rss_mb") else ""
+        cached = ", cached" if result.get("cache") == "hit" else ""
+        print(f"   {mark} #{result['index']} {result['output']} ({result['seconds']}s{rss}{cached})")
 
-# === Hard Limits (so n8n can enforce before calling this) ===
-TITLE_MAX_CHARS = 70           # applies to MAIN TITLE only
-SUBTITLE_MAX_CHARS = 140       # soft cap for subtitle
-DESC_MAX_CHARS = 400
-SPINE_MAX_CHARS = 80
+    summary = run_batch(rows, workers=args.workers, on_result=report, chunk_size=args.chunk_size)
+    write_summary(summary, args.summary)
+    print(f"✅ {summary['succeeded']} ok, {summary['failed']} failed, {summary['invalid']} invalid "
+          f"in {summary['seconds']}s — summary at: {args.summary}")
+    if summary["cache_hits"] or summary["cache_misses"]:
+        print(f"   ♻️  Render cache: {summary['cache_hits']} hit(s), {summary['cache_misses']} miss(es)")
 
-# === Preferred Fonts (installed) ===
-PRO_TITLE_FONTS = ["Playfair Display", "EB Garamond", "Libre Baskerville", "DejaVu Serif"]
-PRO_BODY_FONTS  = ["Merriweather", "Lora", "Roboto Slab", "DejaVu Serif"]
 
+def run_variants(args, job, title_font, body_font):
+    from batch import load_manifest
 
-def pick_font(preferred_list):
-    for fam in preferred_list:
-        try:
-            verify_font_available(fam)
-            return fam
-        except Exception:
-            continue
-    return "DejaVu Serif"
+    variants = load_manifest(args.variants)
+    print(f"🧪 Variants: {len(variants)} from {args.variants} (background prepared once)")
 
+    def report(result):
+        mark = "✔" if result["status"] == "ok" else "✘"
+        detail = f" — {result['error']}" if result["error"] else ""
+        print(f"   {mark} #{result['index']} {result['output']} ({result['seconds']}s){detail}")
 
-def split_title_subtitle(text: str):
-    """Return (main_title, subtitle) by splitting on common separators."""
-    for sep in [" — ", " – ", " - ", ":", "|", "—", "–", "-"]:
-        if sep in text:
-            parts = [p.strip() for p in text.split(sep, 1)]
-            if len(parts) == 2:
-                return parts[0], parts[1]
-    return text, ""
+    results = render_variants(job, variants, title_font, body_font, on_result=report)
+    ok = sum(r["status"] == "ok" for r in results)
+    print(f"✅ {ok}/{len(results)} variant(s) rendered")
 
 
 def main():
     parser = argparse.ArgumentParser(description="FBNP Cover Text Renderer (Pro Defaults)")
-    # Required
-    parser.add_argument("--cover", type=str, required=True, help="Path to base cover image")
-    parser.add_argument("--output", type=str, default="final_cover.png", help="Output file name")
-    parser.add_argument("--title", type=str, required=True, help="Book title (subtitle optional via ':', '-', '—', '|')")
-    parser.add_argument("--description", type=str, required=True, help="Back cover description")
-    parser.add_argument("--author", type=str, default="", help="Author name")
+    # Required (unless --manifest is given)
+    parser.add_argument("--cover", type=str, help="Path to base cover image")
+    parser.add_argument("--output", type=str, default=JOB_DEFAULTS["output"], help="Output file name (.png/.jpg/.tif raster, .pdf with vector text)")
+    parser.add_argument("--title", type=str, help="Book title (subtitle optional via ':', '-', '—', '|')")
+    parser.add_argument("--description", type=str, help="Back cover description")
+    parser.add_argument("--author", type=str, default=JOB_DEFAULTS["author"], help="Author name")
 
     # Dimensions
-    parser.add_argument("--width", type=int, required=True, help="Full cover width (px)")
-    parser.add_argument("--height", type=int, required=True, help="Full cover height (px)")
-    parser.add_argument("--spine_width", type=int, required=True, help="Spine width (px)")
+    parser.add_argument("--width", type=int, help="Full cover width (px)")
+    parser.add_argument("--height", type=int, help="Full cover height (px)")
+    parser.add_argument("--spine_width", type=int, help="Spine width (px)")
+    parser.add_argument("--template", type=str, default=JOB_DEFAULTS["template"],
+                        help="Layout template JSON (see layout_template.py); supplies width, height and spine width")
 
     # Optional overrides (you usually don't need to touch these)
-    parser.add_argument("--title_size", type=int, default=96)
-    parser.add_argument("--desc_size", type=int, default=48)
-    parser.add_argument("--spine_size", type=int, default=64)
-    parser.add_argument("--title_color", type=str, default="#000000")
-    parser.add_argument("--desc_color", type=str, default="#333333")
+    parser.add_argument("--title_size", type=int, default=JOB_DEFAULTS["title_size"])
+    parser.add_argument("--desc_size", type=int, default=JOB_DEFAULTS["desc_size"])
+    parser.add_argument("--spine_size", type=int, default=JOB_DEFAULTS["spine_size"])
+    parser.add_argument("--title_color", type=str, default=JOB_DEFAULTS["title_color"])
+    parser.add_argument("--desc_color", type=str, default=JOB_DEFAULTS["desc_color"])
     parser.add_argument("--debug", action="store_true", help="Draw KDP safe-zone guides")
+    parser.add_argument("--compositor", type=str, choices=["pil", "cairo"], default=JOB_DEFAULTS["compositor"],
+                        help="pil: paste each text block; cairo: draw all text on one surface")
+    parser.add_argument("--auto_fit", action="store_true",
+                        help="Pick the largest font sizes that fit each text box (overrides *_size)")
+    parser.add_argument("--auto_layout", action="store_true",
+                        help="Place title and description on the calmest art and pick text colors and panel "
+                             "opacity from it (overrides the colors)")
+    parser.add_argument("--low_memory", action="store_true",
+                        help="RGB-only, region-at-a-time rendering for large wraps / many workers")
+    parser.add_argument("--mirror_bleed", action="store_true",
+                        help="Art is trim-size only: fit it to the trim and mirror its edges into the bleed")
+    parser.add_argument("--output_profile", type=str, default=None, choices=list(OUTPUT_PROFILES),
+                        help="Raster encoder profile (default: format from extension, PIL defaults)")
+    parser.add_argument("--ingest_cache", type=str, default=JOB_DEFAULTS["ingest_cache"],
+                        help="Directory for cached, normalized cover art")
+    parser.add_argument("--preview", action="store_true",
+                        help=f"Quick proof at {PREVIEW_DPI} DPI with the fast blur (same layout, scaled down)")
+    parser.add_argument("--preview_dpi", type=int, default=None,
+                        help="Proof resolution (e.g. 72-100); implies --preview")
+    parser.add_argument("--blur", type=str, default=None, choices=["gaussian", "fast"],
+                        help="Panel blur: exact gaussian (default) or fast approximation (default for previews)")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Render the text blocks and blur the panels on a thread pool (lower latency per cover)")
+    parser.add_argument("--render_cache", type=str, default=JOB_DEFAULTS["render_cache"],
+                        help="Directory of finished covers keyed by art + parameters; a repeat job is copied, not rendered")
+    parser.add_argument("--render_cache_mb", type=int, default=JOB_DEFAULTS["render_cache_mb"],
+                        help="Render cache size cap; least recently used covers are evicted past it")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record wall time and memory per render stage as JSON next to the output")
+    parser.add_argument("--profile_out", type=str, default=None,
+                        help="Stage timings JSON path (default: <output>.profile.json)")
+
+    # Batch mode
+    parser.add_argument("--manifest", type=str, help="JSONL/CSV manifest of cover jobs (batch mode)")
+    parser.add_argument("--workers", type=int, default=None, help="Batch worker processes (default: CPU count)")
+    parser.add_argument("--summary", type=str, default="batch_summary.json", help="Batch summary JSON path")
+    parser.add_argument("--chunk_size", type=int, default=4,
+                        help="Jobs handed to a worker at once (their encodes overlap the next render)")
+
+    # Variants: one background, many text layers
+    parser.add_argument("--variants", type=str,
+                        help="JSONL/CSV of text variants (output, title, colors, sizes, fonts) to render "
+                             "over this cover's background, prepared once")
+
+    # Validation only (nothing is rendered; the render stack is not imported)
+    parser.add_argument("--validate", action="store_true",
+                        help="Check limits, colors, dimensions and options, print a JSON report and exit")
+    parser.add_argument("--check_fit", action="store_true",
+                        help="With --validate: also measure each text block against its box (loads Pango)")
 
     args = parser.parse_args()
 
-    # === Split title BEFORE validation ===
-    main_title, subtitle = split_title_subtitle(args.title)
+    if args.preview and args.preview_dpi is None:
+        args.preview_dpi = PREVIEW_DPI
+    raw = {k: v for k, v in vars(args).items() if v is not None}
 
-    # === Limits ===
-    if len(main_title) > TITLE_MAX_CHARS:
-        sys.exit(f"❌ ERROR: Main title exceeds {TITLE_MAX_CHARS} characters (got {len(main_title)}).")
-    if subtitle and len(subtitle) > SUBTITLE_MAX_CHARS:
-        sys.exit(f"❌ ERROR: Subtitle exceeds {SUBTITLE_MAX_CHARS} characters (got {len(subtitle)}).")
-    if len(args.description) > DESC_MAX_CHARS:
-        sys.exit(f"❌ ERROR: Description exceeds {DESC_MAX_CHARS} characters (got {len(args.description)}).")
+    if args.validate:
+        run_validate(args, raw)
+        return
 
-    spine_title = main_title  # use ONLY main title on spine
-    spine_text = f"{spine_title} • {args.author}" if args.author else spine_title
-    if len(spine_text) > SPINE_MAX_CHARS:
-        sys.exit(f"❌ ERROR: Spine text exceeds {SPINE_MAX_CHARS} characters (got {len(spine_text)}).")
+    if args.manifest:
+        run_manifest(args)
+        return
 
-    # === Colors ===
-    def hex_to_rgb(hx: str):
-        hx = hx.lstrip("#")
-        return tuple(int(hx[i:i+2], 16) for i in (0, 2, 4))
+    missing = [f for f in REQUIRED_FIELDS if getattr(args, f) is None
+               and not (args.template and f in TEMPLATE_FIELDS)]
+    if missing:
+        parser.error("the following arguments are required: " + ", ".join(f"--{f}" for f in missing))
 
-    title_color = hex_to_rgb(args.title_color)
-    desc_color = hex_to_rgb(args.desc_color)
+    # Pure-Python checks first: a rejected job never loads the render stack
+    from validation import check_job
+
+    report = check_job(raw)
+    if not report["valid"]:
+        sys.exit("\n".join(report["errors"]))
+    job = normalize_job(raw)
+    subtitle = report["subtitle"]
+
+    profiler = StageProfiler() if job["profile"] else None
 
     # === “Professional mode” always on ===
-    title_font = pick_font(PRO_TITLE_FONTS)
-    body_font = pick_font(PRO_BODY_FONTS)
-    verify_font_available(title_font)
-    verify_font_available(body_font)
+    with stage(profiler, "fonts"):
+        title_font, body_font = pick_fonts()
 
     print("\n✨ Professional Defaults:")
     print(f"   ✔ Title Font: {title_font}")
@@ -98,33 +195,32 @@ def main():
     else:
         print()
 
+    if args.variants:
+        run_variants(args, job, title_font, body_font)
+        return
+
+    cache = open_render_cache(job)
+    if cache is not None:
+        start = time.perf_counter()
+        key = cache.key(job, title_font, body_font)
+        if cache.fetch(key, job["output"]):
+            print(f"♻️  Render cache hit ({(time.perf_counter() - start) * 1000:.1f} ms): {job['output']}")
+            return
+
     # === Render ===
-    engine = CoverLayoutEngine(args.cover, args.width, args.height, args.spine_width, debug=args.debug)
     print("🔍 Rendering cover...")
-
-    # Pass full title (so layout_engine can split/stylize again consistently)
-    engine.add_text(
-        title=args.title,                 # keep original for display (title + optional subtitle)
-        description=args.description,
-        author=args.author,
-        font_family=title_font,
-        title_font_size=args.title_size,
-        desc_font_size=args.desc_size,
-        spine_font_size=args.spine_size,
-        title_color=title_color,
-        desc_color=desc_color,
-        # Always-on pro styling
-        add_bg=True,
-        line_spacing=10,
-        gradient_bg=True,
-        text_shadow=True,
-        letter_spacing=1.2,
-        body_font=body_font,
-        blur_bg=True,
-    )
-
-    engine.save(args.output)
-    print(f"✅ Final cover saved at: {args.output}")
+    engine = render_job(job, title_font, body_font, profiler=profiler)
+    print(f"✅ Final cover saved at: {job['output']}")
+    if cache is not None:
+        cache.store(key, job["output"])
+        stats = cache.report()
+        print(f"   ♻️  Stored in render cache ({stats['entries']} cover(s), {stats['mb']}/{stats['max_mb']} MB)")
+    print(f"   📈 Peak RSS: {engine.peak_rss_mb} MB")
+    if profiler:
+        slowest = sorted((r for r in profiler.records if "." not in r["name"]),
+                         key=lambda r: r["seconds"], reverse=True)[:3]
+        print(f"   ⏱  Stage timings at: {profile_path(job)} (slowest: "
+              + ", ".join(f"{r['name']} {r['seconds']}s" for r in slowest) + ")")
 
 
 if __name__ == "__main__":
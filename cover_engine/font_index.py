@@ -0,0 +1,161 @@
+"""
+In-process index of installed font families.
+
+The font map is queried once (PangoCairo, or a single `fc-list` call when
+PyGObject is unavailable) and the result is cached on disk, keyed by the
+modification times of the fontconfig directories. Availability and fallback
+queries are then plain dict lookups.
+"""
+import json
+import os
+import subprocess
+import threading
+
+# Directories fontconfig scans by default; installing or removing a font
+# touches one of them, which invalidates the on-disk cache.
+FONT_DIRS = [
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    "~/.fonts",
+    "~/.local/share/fonts",
+    "/etc/fonts",
+]
+
+CACHE_PATH = os.environ.get(
+    "FBNP_FONT_CACHE",
+    os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                 "fbnp_cover_engine", "font_index.json"),
+)
+
+_index = None
+_lock = threading.Lock()
+
+
+def _normalize(family: str):
+    # fontconfig compares family names ignoring case and blanks
+    return "".join(family.split()).lower()
+
+
+def _dir_signature():
+    """Map every font directory (recursively) to its mtime."""
+    signature = {}
+    for root in FONT_DIRS:
+        root = os.path.expanduser(root)
+        if not os.path.isdir(root):
+            continue
+        for dirpath, _dirnames, _filenames in os.walk(root):
+            try:
+                signature[dirpath] = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+    return signature
+
+
+def _families_from_pango():
+    import gi
+
+    gi.require_version("PangoCairo", "1.0")
+    from gi.repository import PangoCairo
+
+    families = {}
+    for family in PangoCairo.FontMap.get_default().list_families():
+        styles = sorted({face.get_face_name() for face in family.list_faces()})
+        families[family.get_name()] = styles
+    return families
+
+
+def _families_from_fc_list():
+    try:
+        result = subprocess.run(["fc-list", ":", "family", "style"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return {}
+    families = {}
+    for line in result.stdout.splitlines():
+        names, _, style = line.partition(":")
+        style = style.replace("style=", "").split(",")[0].strip()
+        for name in names.split(","):
+            name = name.strip()
+            if name:
+                families.setdefault(name, set()).add(style or "Regular")
+    return {name: sorted(styles) for name, styles in families.items()}
+
+
+class FontIndex:
+    """Installed families (with their styles), queryable by family name."""
+
+    def __init__(self, families: dict):
+        self.families = families
+        self._lookup = {_normalize(name): name for name in families}
+
+    @classmethod
+    def build(cls):
+        """Query the system font map directly (slow path)."""
+        try:
+            families = _families_from_pango()
+        except (ImportError, ValueError):
+            families = _families_from_fc_list()
+        return cls(families)
+
+    @classmethod
+    def load_or_build(cls, cache_path=CACHE_PATH):
+        """Load the cached index if the font directories are unchanged, else rebuild it."""
+        signature = _dir_signature()
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("signature") == signature:
+                return cls(cached["families"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = cls.build()
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"signature": signature, "families": index.families}, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass  # a read-only cache dir only costs us the rebuild next time
+        return index
+
+    def has_family(self, font_family: str):
+        return _normalize(font_family) in self._lookup
+
+    def styles(self, font_family: str):
+        name = self._lookup.get(_normalize(font_family))
+        return list(self.families[name]) if name else []
+
+    def pick(self, preferred_list, fallback="DejaVu Serif"):
+        """Return the first installed family from preferred_list, else fallback."""
+        for fam in preferred_list:
+            if self.has_family(fam):
+                return fam
+        return fallback
+
+
+def get_font_index():
+    """Process-wide FontIndex, loaded on first use."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = FontIndex.load_or_build()
+    return _index
+
+
+def verify_font_available(font_family: str):
+    """
+    Check if the given font family is available on the system via fontconfig.
+    Answered from the cached in-process font index, without loading Pango.
+    Raises ValueError if not found.
+    """
+    if not get_font_index().has_family(font_family):
+        raise ValueError(f"❌ Font '{font_family}' is not installed. Please install it and run again.")
+
+
+def refresh_font_index():
+    """Drop the in-process index so the next query re-checks the font directories."""
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,62 @@
+"""
+Cover geometry in pure Python: KDP safe zones and text boxes in px.
+
+Shared by CoverLayoutEngine and the validation fast path, which must not
+import PIL, cairo or Pango.
+"""
+from config import DPI, BLEED_INCH, SAFE_MARGIN_INCH
+
+
+def safe_zones(final_width, final_height, spine_width, dpi=DPI):
+    """KDP safe zones (x, y, w, h), text area heights and spine box, in px."""
+    bleed = int(BLEED_INCH * dpi)
+    margin = int(SAFE_MARGIN_INCH * dpi)
+    inner_padding = int(0.1 * dpi)
+
+    back_width = (final_width - spine_width) // 2
+    front_width = back_width
+
+    # Back (left)
+    back_safe_x = bleed + margin
+    back_safe_y = bleed + margin
+    back_safe_width = back_width - (bleed + margin + inner_padding)
+    back_safe_height = final_height - (2 * bleed) - (2 * margin)
+
+    # Front (right)
+    front_safe_x = back_width + spine_width + bleed + margin
+    front_safe_y = bleed + margin
+    front_safe_width = front_width - (bleed + margin + inner_padding)
+    front_safe_height = final_height - (2 * bleed) - (2 * margin)
+
+    # Sub-areas: title, subtitle (front) and description (back)
+    areas = (int(front_safe_height * 0.36), int(front_safe_height * 0.16), int(back_safe_height * 0.52))
+
+    return {
+        "back": (back_safe_x, back_safe_y, back_safe_width, back_safe_height),
+        "front": (front_safe_x, front_safe_y, front_safe_width, front_safe_height),
+        "areas": areas,
+        "spine_box": (int(spine_width * 0.9), int(final_height * 0.8)),
+    }
+
+
+def text_boxes(zones):
+    """(width, height) of each text block; the spine box is given unrotated."""
+    front_w, back_w = zones["front"][2], zones["back"][2]
+    title_h, subtitle_h, desc_h = zones["areas"]
+    spine_w, spine_h = zones["spine_box"]
+    return {
+        "title": (front_w, title_h),
+        "subtitle": (front_w, subtitle_h),
+        "desc": (back_w, desc_h),
+        "spine": (spine_h, spine_w),
+    }
+
+
+def fit_styles(letter_spacing, line_spacing):
+    """measure_text options per block; these mirror how add_text places each block."""
+    return {
+        "title": {"padding_px": 18, "bold": True, "letter_spacing": letter_spacing},
+        "subtitle": {"padding_px": 8, "letter_spacing": letter_spacing * 0.8},
+        "desc": {"padding_px": 16, "spacing": line_spacing, "justify": True},
+        "spine": {"letter_spacing": 1.6, "small_caps": True},
+    }
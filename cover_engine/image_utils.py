@@ -1,9 +1,184 @@
-from PIL import Image
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from PIL import Image, ImageFilter, ImageOps
+
+from config import BLUR_MODES
+
+# Easing curves for gradient fades: map t in [0, 1] to progress in [0, 1]
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: 1 - (1 - t) * (1 - t),
+    "ease_in_out": lambda t: t * t * (3 - 2 * t),
+}
+# Direction the fade travels: "down" is opaque at the top edge, clear at the bottom
+GRADIENT_DIRECTIONS = ("down", "up", "right", "left")
+
+# Modes Image.reduce and LANCZOS resampling handle as they are
+RESAMPLE_MODES = ("L", "RGB", "RGBA", "CMYK")
+
+# Recently normalized covers, keyed by source hash + target geometry (memory_cache=True only)
+_COVER_CACHE = OrderedDict()
+_COVER_CACHE_SIZE = 2
+_COVER_CACHE_LOCK = threading.Lock()
+
 
 def resize_with_aspect_ratio(image, target_width, target_height):
     image.thumbnail((target_width, target_height), Image.LANCZOS)
     return image
 
 def add_bleed(image, bleed_size):
-    # Adds bleed margin to image
-    pass
+    """
+    Return a copy of `image` grown by `bleed_size` px on every side, filled by
+    mirroring the outer edges so artwork runs cleanly past the trim line.
+    """
+    w, h = image.size
+    b = min(int(bleed_size), w, h)
+    if b <= 0:
+        return image.copy()
+
+    out = Image.new(image.mode, (w + 2 * b, h + 2 * b))
+    out.paste(image, (b, b))
+    # Left / right strips, then top / bottom across the full width (fills corners)
+    out.paste(image.crop((0, 0, b, h)).transpose(Image.FLIP_LEFT_RIGHT), (0, b))
+    out.paste(image.crop((w - b, 0, w, h)).transpose(Image.FLIP_LEFT_RIGHT), (w + b, b))
+    out.paste(out.crop((0, b, w + 2 * b, 2 * b)).transpose(Image.FLIP_TOP_BOTTOM), (0, 0))
+    out.paste(out.crop((0, h, w + 2 * b, h + b)).transpose(Image.FLIP_TOP_BOTTOM), (0, h + b))
+    return out
+
+
+def _resampleable(img):
+    """Convert palette, bilevel, 16-bit and other modes reduce() rejects to L, RGB or RGBA."""
+    if img.mode in RESAMPLE_MODES:
+        return img
+    if img.mode.startswith("I;16"):
+        # 16-bit grayscale: keep the tones instead of clipping everything above 255 to white
+        return img.convert("I").point(lambda v: v / 256).convert("L")
+    has_alpha = "A" in img.mode or "transparency" in img.info
+    return img.convert("RGBA" if has_alpha else "RGB")
+
+
+def _decode_for_size(data: bytes, target_w: int, target_h: int):
+    """Decode no more pixels than needed for a target_w x target_h result."""
+    img = Image.open(io.BytesIO(data))
+    if img.format == "JPEG":
+        # DCT scaling: decodes at 1/2, 1/4 or 1/8 size while staying >= target
+        img.draft("RGB", (target_w, target_h))
+    img.load()
+    img = _resampleable(img)
+    factor = min(img.width // max(1, target_w), img.height // max(1, target_h))
+    if factor >= 2:
+        img = img.reduce(factor)
+    return img
+
+
+def load_cover(path, final_width, final_height, mode="RGBA", bleed_px=0, cache_dir=None,
+               memory_cache=False):
+    """
+    Load cover art normalized to exactly final_width x final_height.
+
+    Oversized sources are decoded with JPEG draft mode / Image.reduce, then
+    scaled and center-cropped to the target aspect. With bleed_px > 0 the art
+    is treated as trim-only: it is fitted to the trim size and the bleed is
+    added by mirroring its edges.
+
+    Results are cached by source hash and target geometry: on disk as
+    uncompressed TIFFs when cache_dir is given, and with memory_cache=True
+    also for the last couple of covers in this process (each hit costs a
+    full copy, so only worth it when the same art is rendered repeatedly).
+    Returns (image, source_hash).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    source_hash = hashlib.sha1(data).hexdigest()
+    key = f"{source_hash}-{final_width}x{final_height}-b{bleed_px}-{mode}"
+
+    if memory_cache:
+        with _COVER_CACHE_LOCK:
+            cached = _COVER_CACHE.get(key)
+            if cached is not None:
+                _COVER_CACHE.move_to_end(key)
+        if cached is not None:
+            return cached.copy(), source_hash
+
+    cache_path = os.path.join(cache_dir, f"{key}.tiff") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        img = Image.open(cache_path)
+        img.load()
+    else:
+        trim_w, trim_h = final_width - 2 * bleed_px, final_height - 2 * bleed_px
+        img = _decode_for_size(data, trim_w, trim_h)
+        del data
+        if img.size != (trim_w, trim_h):
+            img = ImageOps.fit(img, (trim_w, trim_h), Image.LANCZOS, centering=(0.5, 0.5))
+        if bleed_px > 0:
+            img = add_bleed(img, bleed_px)
+        if img.mode != mode:
+            img = img.convert(mode)
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            img.save(tmp, format="TIFF")
+            os.replace(tmp, cache_path)
+
+    if not memory_cache:
+        return img, source_hash
+    with _COVER_CACHE_LOCK:
+        _COVER_CACHE[key] = img
+        if len(_COVER_CACHE) > _COVER_CACHE_SIZE:
+            _COVER_CACHE.popitem(last=False)
+    return img.copy(), source_hash
+
+
+@lru_cache(maxsize=16)
+def gradient_mask(width, height, opacity=175, direction="down", easing="linear"):
+    """
+    Return an "L" alpha mask fading from `opacity` to 0 along `direction`.
+
+    Built entirely in C: PIL's 256-step linear gradient is resized to the box
+    and mapped through an easing/opacity lookup table. Masks are cached by
+    their arguments, so treat the returned image as read-only.
+    """
+    if direction not in GRADIENT_DIRECTIONS:
+        raise ValueError(f"Unknown gradient direction '{direction}' (use one of {GRADIENT_DIRECTIONS}).")
+    if easing not in EASINGS:
+        raise ValueError(f"Unknown gradient easing '{easing}' (use one of {tuple(EASINGS)}).")
+
+    ease = EASINGS[easing]
+    lut = [int(opacity * (1 - ease(v / 255))) for v in range(256)]
+
+    vertical = direction in ("down", "up")
+    length, breadth = (height, width) if vertical else (width, height)
+    ramp = Image.linear_gradient("L").resize((max(1, breadth), max(1, length)), Image.BILINEAR)
+    mask = ramp.point(lut)
+
+    if direction == "up":
+        mask = mask.transpose(Image.FLIP_TOP_BOTTOM)
+    elif direction == "right":
+        mask = mask.transpose(Image.TRANSPOSE)
+    elif direction == "left":
+        mask = mask.transpose(Image.TRANSVERSE)
+    return mask
+
+
+def blur_image(image, radius, mode="gaussian"):
+    """
+    Blur `image` by `radius` px.
+
+    "fast" approximates GaussianBlur(radius) by averaging the image down by
+    a factor of about radius / 3, blurring that with the remaining radius and
+    scaling back up bilinearly: roughly factor^2 fewer pixels go through the
+    blur. Soft panel backgrounds look the same; small radii fall back to the
+    exact blur.
+    """
+    if mode not in BLUR_MODES:
+        raise ValueError(f"Unknown blur mode '{mode}' (use one of {BLUR_MODES}).")
+    factor = int(radius // 3) if mode == "fast" else 1
+    if factor < 2 or min(image.size) < 4 * factor:
+        return image.filter(ImageFilter.GaussianBlur(radius))
+    small = image.reduce(factor).filter(ImageFilter.GaussianBlur(radius / factor))
+    return small.resize(image.size, Image.BILINEAR)
@@ -0,0 +1,372 @@
+"""
+Cover job description shared by the CLI and batch mode.
+
+A job is a plain dict with the same fields as the CLI arguments of
+coverlayoutengine.py, so a manifest row and a command line describe
+exactly the same render.
+
+Importing this module is cheap: the rendering stack (PIL, cairo, Pango) is
+only imported once a job is actually rendered, so validation stays fast.
+"""
+import time
+
+from profiler import StageProfiler
+
+# === Hard Limits (so n8n can enforce before calling this) ===
+TITLE_MAX_CHARS = 70           # applies to MAIN TITLE only
+SUBTITLE_MAX_CHARS = 140       # soft cap for subtitle
+DESC_MAX_CHARS = 400
+SPINE_MAX_CHARS = 80
+
+# === Preferred Fonts (installed) ===
+PRO_TITLE_FONTS = ["Playfair Display", "EB Garamond", "Libre Baskerville", "DejaVu Serif"]
+PRO_BODY_FONTS  = ["Merriweather", "Lora", "Roboto Slab", "DejaVu Serif"]
+
+# === Job fields (mirror the CLI arguments) ===
+REQUIRED_FIELDS = ("cover", "title", "description", "width", "height", "spine_width")
+# Required fields a layout template (see layout_template.py) can supply instead
+TEMPLATE_FIELDS = ("width", "height", "spine_width")
+JOB_DEFAULTS = {
+    "output": "final_cover.png",
+    "author": "",
+    "title_size": 96,
+    "desc_size": 48,
+    "spine_size": 64,
+    "title_color": "#000000",
+    "desc_color": "#333333",
+    "debug": False,
+    "compositor": "pil",
+    "auto_fit": False,
+    "auto_layout": False,
+    "low_memory": False,
+    "mirror_bleed": False,
+    "ingest_cache": "",
+    "output_profile": "",
+    "profile": False,
+    "profile_out": "",
+    "preview_dpi": 0,
+    "blur": "",
+    "parallel": False,
+    "render_cache": "",
+    "render_cache_mb": 2048,
+    "template": "",
+}
+# Always-on "professional mode" styling passed to CoverLayoutEngine.add_text
+PRO_TEXT_STYLE = {
+    "add_bg": True,
+    "line_spacing": 10,
+    "gradient_bg": True,
+    "text_shadow": True,
+    "letter_spacing": 1.2,
+    "blur_bg": True,
+}
+# Fields a text variant may override (see render_variants); the rest come from the base job
+VARIANT_FIELDS = ("output", "title", "description", "author", "title_size", "desc_size", "spine_size",
+                  "title_color", "desc_color", "auto_fit", "output_profile", "title_font", "body_font")
+INT_FIELDS = ("width", "height", "spine_width", "title_size", "desc_size", "spine_size", "preview_dpi",
+              "render_cache_mb")
+BOOL_FIELDS = ("debug", "auto_fit", "auto_layout", "low_memory", "mirror_bleed", "profile", "parallel")
+
+
+def pick_font(preferred_list):
+    from font_index import get_font_index
+
+    return get_font_index().pick(preferred_list, fallback="DejaVu Serif")
+
+
+def pick_fonts():
+    """
+    Return (title_font, body_font) from the professional defaults, verified.
+    Answered from the on-disk font index alone, so a render cache hit never
+    loads the render stack.
+    """
+    from font_index import verify_font_available
+
+    title_font = pick_font(PRO_TITLE_FONTS)
+    body_font = pick_font(PRO_BODY_FONTS)
+    verify_font_available(title_font)
+    verify_font_available(body_font)
+    return title_font, body_font
+
+
+def split_title_subtitle(text: str):
+    """Return (main_title, subtitle) by splitting on common separators."""
+    for sep in [" — ", " – ", " - ", ":", "|", "—", "–", "-"]:
+        if sep in text:
+            parts = [p.strip() for p in text.split(sep, 1)]
+            if len(parts) == 2:
+                return parts[0], parts[1]
+    return text, ""
+
+
+def hex_to_rgb(hx: str):
+    hx = hx.lstrip("#")
+    return tuple(int(hx[i:i+2], 16) for i in (0, 2, 4))
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y", "on")
+    return bool(value)
+
+
+def normalize_job(raw: dict):
+    """
+    Fill defaults and coerce types for a job coming from a manifest row.
+    CSV cells arrive as strings, and empty cells count as missing. A job
+    naming a layout template takes its width, height and spine width from it.
+    Raises ValueError on missing or malformed fields.
+    """
+    job = dict(JOB_DEFAULTS)
+    for key, value in raw.items():
+        if key not in JOB_DEFAULTS and key not in REQUIRED_FIELDS:
+            continue  # unknown columns are ignored
+        if value is None or (isinstance(value, str) and value == "" and key != "author"):
+            continue
+        job[key] = value
+
+    if job["template"]:
+        template = _job_template(job["template"])
+        for key, value in zip(TEMPLATE_FIELDS, template.size):
+            job.setdefault(key, value)
+
+    missing = [f for f in REQUIRED_FIELDS if f not in job]
+    if missing:
+        raise ValueError(f"❌ ERROR: Missing required field(s): {', '.join(missing)}.")
+
+    for key in INT_FIELDS:
+        try:
+            job[key] = int(job[key])
+        except (TypeError, ValueError):
+            raise ValueError(f"❌ ERROR: Field '{key}' must be an integer (got {job[key]!r}).")
+    for key in BOOL_FIELDS:
+        job[key] = _to_bool(job[key])
+    for key in ("cover", "output", "title", "description", "author", "title_color", "desc_color", "compositor",
+                "ingest_cache", "output_profile", "profile_out", "blur", "render_cache",
+                "template"):
+        job[key] = str(job[key])
+    if job["template"] and not _job_template(job["template"]).matches(*(job[k] for k in TEMPLATE_FIELDS)):
+        raise ValueError(f"❌ ERROR: Width, height and spine width do not match layout template {job['template']}.")
+    return job
+
+
+def _job_template(path: str):
+    from layout_template import load_template
+
+    try:
+        return load_template(path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"❌ ERROR: Cannot load layout template {path} ({e}).")
+
+
+def check_limits(job: dict):
+    """
+    Check the hard text limits on a job without raising.
+    Returns (main_title, subtitle, spine_text, errors).
+    """
+    # === Split title BEFORE validation ===
+    main_title, subtitle = split_title_subtitle(job["title"])
+
+    # === Limits ===
+    errors = []
+    if len(main_title) > TITLE_MAX_CHARS:
+        errors.append(f"❌ ERROR: Main title exceeds {TITLE_MAX_CHARS} characters (got {len(main_title)}).")
+    if subtitle and len(subtitle) > SUBTITLE_MAX_CHARS:
+        errors.append(f"❌ ERROR: Subtitle exceeds {SUBTITLE_MAX_CHARS} characters (got {len(subtitle)}).")
+    if len(job["description"]) > DESC_MAX_CHARS:
+        errors.append(f"❌ ERROR: Description exceeds {DESC_MAX_CHARS} characters (got {len(job['description'])}).")
+
+    spine_title = main_title  # use ONLY main title on spine
+    spine_text = f"{spine_title} • {job['author']}" if job["author"] else spine_title
+    if len(spine_text) > SPINE_MAX_CHARS:
+        errors.append(f"❌ ERROR: Spine text exceeds {SPINE_MAX_CHARS} characters (got {len(spine_text)}).")
+
+    return main_title, subtitle, spine_text, errors
+
+
+def validate_job(job: dict):
+    """
+    Enforce the hard limits on a normalized job.
+    Returns (main_title, subtitle, spine_text); raises ValueError on violation.
+    """
+    main_title, subtitle, spine_text, errors = check_limits(job)
+    if errors:
+        raise ValueError(errors[0])
+    return main_title, subtitle, spine_text
+
+
+def profile_path(job: dict):
+    """Where a profiled job writes its stage timings (next to the output by default)."""
+    return job["profile_out"] or job["output"] + ".profile.json"
+
+
+def write_job_profile(job: dict, engine):
+    """Write the engine's stage timings for a job rendered with profile=True."""
+    if engine.profiler is None:
+        return None
+    path = profile_path(job)
+    engine.profiler.write_json(path)
+    return path
+
+
+def open_render_cache(job: dict):
+    """The job's RenderCache (see render_cache.py), or None when caching is off."""
+    if not job["render_cache"]:
+        return None
+    from render_cache import RenderCache
+
+    return RenderCache(job["render_cache"], job["render_cache_mb"])
+
+
+def output_compositor(output: str, compositor: str):
+    """The compositor to render `output` with: PDF text only stays vector when cairo draws it."""
+    return "cairo" if output.lower().endswith(".pdf") else compositor
+
+
+def _new_engine(job: dict, profiler=None, template=None):
+    from layout_engine import CoverLayoutEngine
+
+    if template is None and job["template"]:
+        template = _job_template(job["template"])
+    return CoverLayoutEngine(job["cover"], job["width"], job["height"], job["spine_width"],
+                             debug=job["debug"], compositor=output_compositor(job["output"], job["compositor"]),
+                             low_memory=job["low_memory"], mirror_bleed=job["mirror_bleed"],
+                             cache_dir=job["ingest_cache"] or None, profiler=profiler,
+                             preview_dpi=job["preview_dpi"] or None, blur=job["blur"] or None,
+                             parallel=job["parallel"], template=template)
+
+
+def _add_job_text(engine, job: dict, title_font: str, body_font: str):
+    # Pass full title (so layout_engine can split/stylize again consistently)
+    engine.add_text(
+        title=job["title"],               # keep original for display (title + optional subtitle)
+        description=job["description"],
+        author=job["author"],
+        font_family=title_font,
+        title_font_size=job["title_size"],
+        desc_font_size=job["desc_size"],
+        spine_font_size=job["spine_size"],
+        title_color=hex_to_rgb(job["title_color"]),
+        desc_color=hex_to_rgb(job["desc_color"]),
+        body_font=body_font,
+        auto_fit=job["auto_fit"],
+        auto_layout=job["auto_layout"],
+        # Always-on pro styling
+        **PRO_TEXT_STYLE,
+    )
+
+
+def render_job(job: dict, title_font: str, body_font: str, background=False, profiler=None, template=None):
+    """
+    Render and save one normalized, validated job with the given fonts.
+    With background=True the encode runs on a thread; call engine.wait_saved().
+    template: a LayoutTemplate of the job's size to reuse (default: the job's
+    "template" file, if any).
+
+    With job["profile"] (or an explicit profiler) every stage is timed; the
+    JSON report is written once the cover is saved (for background saves,
+    call write_job_profile() after wait_saved()).
+    """
+    if profiler is None and job["profile"]:
+        profiler = StageProfiler()
+    engine = _new_engine(job, profiler, template)
+    _add_job_text(engine, job, title_font, body_font)
+    engine.save(job["output"], profile=job["output_profile"] or None, background=background)
+    if not background:
+        write_job_profile(job, engine)
+    return engine
+
+
+def _variant_job(job: dict, overrides: dict, title_font: str, body_font: str):
+    """Merge one variant's overrides into the base job; returns (job, (title_font, body_font))."""
+    from font_index import verify_font_available
+
+    if "_error" in overrides:  # unparseable manifest line (see batch.load_manifest)
+        raise ValueError(overrides["_error"])
+    unknown = sorted(set(overrides) - set(VARIANT_FIELDS))
+    if unknown:
+        raise ValueError(f"❌ ERROR: Field(s) not allowed in a variant: {', '.join(unknown)}.")
+    fonts = (overrides.get("title_font") or title_font, overrides.get("body_font") or body_font)
+    variant = normalize_job({**job, **{k: v for k, v in overrides.items() if k not in ("title_font", "body_font")}})
+    validate_job(variant)
+    if variant["output"].lower().endswith(".pdf"):
+        raise ValueError("❌ ERROR: Variant rendering writes raster covers only.")
+    if variant["output_profile"]:
+        from output_profiles import extension_error
+
+        mismatch = extension_error(variant["output_profile"], variant["output"])
+        if mismatch:
+            raise ValueError(f"❌ ERROR: {mismatch}")
+    for font in set(fonts) - {title_font, body_font}:
+        verify_font_available(font)
+    return variant, fonts
+
+
+def render_variants(job: dict, variants, title_font: str, body_font: str, on_result=None):
+    """
+    Render text variants of one base job (A/B tests) from a single background plan.
+
+    The art is loaded, blurred and gradient-treated and the accent color is
+    sampled once; each variant in `variants` (dicts of VARIANT_FIELDS
+    overrides, e.g. {"output": "b.png", "title": "...", "title_color": "#222222"})
+    only redoes the text layers, and is encoded in the background while the
+    next one renders. Returns one result dict per variant, in order; an
+    invalid or failing variant is recorded and does not stop the rest.
+    """
+    if job["output"].lower().endswith(".pdf"):
+        raise ValueError("❌ ERROR: Variant rendering writes raster covers only.")
+    profiler = StageProfiler() if job["profile"] else None
+    engine = _new_engine(job, profiler)
+    engine.prepare_background(PRO_TEXT_STYLE["gradient_bg"], PRO_TEXT_STYLE["blur_bg"],
+                              auto_layout=job["auto_layout"])
+
+    results = []
+    pending = None  # result of the variant still encoding
+    drawn = False   # the cover holds text that must be cleared first
+
+    def _publish(result):
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    def _settle():
+        nonlocal pending
+        if pending is None:
+            return
+        try:
+            engine.wait_saved()
+        except Exception as e:
+            pending.update(status="failed", error=f"{type(e).__name__}: {e}")
+        _publish(pending)
+        pending = None
+
+    for index, overrides in enumerate(variants):
+        start = time.perf_counter()
+        result = {"index": index, "output": overrides.get("output"), "status": "ok", "error": None}
+        try:
+            variant, fonts = _variant_job(job, overrides, title_font, body_font)
+        except ValueError as e:
+            result.update(status="invalid", error=str(e), seconds=0.0)
+            _settle()
+            _publish(result)
+            continue
+        result["output"] = variant["output"]
+        try:
+            if drawn:
+                engine.restore_background()
+            drawn = True
+            _add_job_text(engine, variant, *fonts)
+            _settle()  # the previous encode overlapped this variant's text rendering
+            engine.save(variant["output"], profile=variant["output_profile"] or None, background=True)
+        except Exception as e:  # one bad variant must not stop the others
+            result.update(status="failed", error=f"{type(e).__name__}: {e}",
+                          seconds=round(time.perf_counter() - start, 4))
+            _settle()
+            _publish(result)
+            continue
+        result["seconds"] = round(time.perf_counter() - start, 4)
+        pending = result
+    _settle()
+
+    write_job_profile(job, engine)
+    return results
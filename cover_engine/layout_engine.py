@@ -1,16 +1,193 @@
-from PIL import Image, ImageDraw, ImageFilter
-from text_renderer import render_text
-from collections import Counter
+import io
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import cairo
+from PIL import ImageDraw
+from text_renderer import (render_text, render_text_strip, draw_text, measure_text, fit_font_size,
+                           image_to_surface, surface_to_image, get_text_context, rotated_size, rotation_matrix)
+from image_utils import gradient_mask, load_cover, blur_image
+from color_utils import extract_palette, pick_accent_color
+from memory_utils import reset_peak_rss, peak_rss_mb
+from output_profiles import encode_image, encode_image_async
+from profiler import stage
+from config import BLEED_INCH, DPI, COMPOSITORS, BLUR_MODES
+from geometry import safe_zones, text_boxes, fit_styles
+from region_analysis import RegionAnalysis, plan_placement
+
+
+BLUR_RADIUS = 12  # px at print resolution
+
+# (min, max) point sizes searched per text block when add_text(auto_fit=True)
+AUTO_FIT_SIZES = {
+    "title": (28, 200),
+    "subtitle": (14, 90),
+    "desc": (18, 64),
+    "spine": (14, 140),
+}
+
+# Shared by every engine with parallel=True; cairo, Pango and PIL's blur release the GIL
+_pool = None
+
+
+def _thread_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="cover-text")
+    return _pool
+
+
+# Text-independent layers prepared once and reused by every text variant
+BackgroundPlan = namedtuple("BackgroundPlan", ["cover", "accent_color", "options", "placement"])
+
+
+def _render_block(text, font_family, font_size, color, box_size, angle=0, **kwargs):
+    """
+    render_text, or render_text_strip for blocks without a panel (the spine),
+    which only allocates the strip the text covers. Returns (image, (dx, dy)),
+    the offset of the image within the block in output px.
+    """
+    if kwargs.get("add_bg") or kwargs.get("gradient_bg"):
+        return render_text(text, font_family, font_size, color, box_size, angle=angle, **kwargs), (0, 0)
+    return render_text_strip(text, font_family, font_size, color, box_size, angle=angle, **kwargs)
+
+
+def text_fit(main_title, subtitle, description, spine_text, font_family, body_font, title_font_size,
+             desc_font_size, spine_font_size, final_width, final_height, spine_width,
+             letter_spacing=1.2, line_spacing=8):
+    """
+    Check whether each text block fits its box at the given size, measuring
+    with Pango only (nothing is rasterized). Returns {block: {"size", "fits",
+    "max_size"}}, where max_size is the largest size that fits without
+    splitting words; blocks with no text are left out.
+    """
+    boxes = text_boxes(safe_zones(final_width, final_height, spine_width))
+    styles = fit_styles(letter_spacing, line_spacing)
+    blocks = {
+        "title": (main_title, font_family, title_font_size),
+        "subtitle": (subtitle, font_family, max(12, int(title_font_size * 0.43))),
+        "desc": (description, body_font, desc_font_size),
+        "spine": (spine_text, font_family, spine_font_size),
+    }
+    report = {}
+    for name, (text, font, size) in blocks.items():
+        if not text.strip():
+            continue
+        style = dict(styles[name])
+        padding = style.pop("padding_px", 12)
+        width, height = boxes[name]
+        text_w, text_h = measure_text(text, font, size, width, padding_px=padding, break_words=False, **style)
+        fits = text_w <= width - 2 * padding and text_h <= height - 2 * padding
+        max_size = size if fits else fit_font_size(text, font, boxes[name], 1, size, padding_px=padding, **style)
+        report[name] = {"size": size, "fits": fits, "max_size": max_size}
+    return report
 
 
 class CoverLayoutEngine:
-    def __init__(self, cover_image_path, final_width, final_height, spine_width, debug=False):
-        self.cover = Image.open(cover_image_path).convert("RGBA")
+    """
+    compositor:
+      "pil"   - every text block renders into its own surface and is pasted (default)
+      "cairo" - text, panels, shadows, rules and the spine are queued and drawn
+                straight onto one cairo surface wrapping the cover, converted
+                back to PIL once (at save time or before the next PIL step)
+
+    low_memory:
+      keep the cover in RGB (alpha is never needed for print), and with the
+      cairo compositor wrap only the region each op touches instead of the
+      whole cover. peak_rss_mb holds the process peak RSS for the render
+      once save() has run.
+
+    The art is normalized to exactly final_width x final_height on load
+    (see image_utils.load_cover). mirror_bleed=True treats it as trim-only art
+    and mirrors its edges out into the bleed; cache_dir keeps normalized
+    covers on disk between runs, and memory_cache=True keeps the last couple
+    in this process for callers that render the same art over and over.
+
+    profiler:
+      optional profiler.StageProfiler; loading, each add_text step and save
+      are recorded as named stages (wall time and RSS).
+
+    preview_dpi:
+      render a proof at this resolution (e.g. 72-100) instead of 300 DPI.
+      The layout is still computed at 300 DPI and every coordinate, font
+      size, padding and blur radius is scaled by preview_dpi / 300, so the
+      proof wraps its lines exactly like the final render. blur picks
+      image_utils.blur_image's mode ("fast" by default for previews).
+
+    parallel:
+      render the text blocks (title, subtitle, description, spine) and blur
+      the two panel regions concurrently on a small thread pool, then
+      composite them in the same fixed order as a sequential render, so the
+      result is identical. Text blocks only run in parallel with the "pil"
+      compositor; the cairo compositor draws onto a single surface.
+
+    text_context:
+      text_renderer.TextContext holding the reusable Pango state; defaults to
+      the process-wide one, which is safe to share between threads.
+
+    template:
+      layout_template.LayoutTemplate for this cover size (see from_template);
+      its precomputed safe zones and gradient masks are reused instead of
+      being rebuilt for every cover of a series.
+
+    Variants: prepare_background() applies the blur, gradient bars and debug
+    guides and samples the accent color once; restore_background() then
+    drops all text so add_text() + save() can render the next variant
+    without redoing any of that work.
+    """
+
+    def __init__(self, cover_image_path, final_width, final_height, spine_width, debug=False,
+                 compositor="pil", low_memory=False, mirror_bleed=False, cache_dir=None,
+                 profiler=None, preview_dpi=None, blur=None, text_context=None, parallel=False, template=None,
+                 memory_cache=False):
+        if compositor not in COMPOSITORS:
+            raise ValueError(f"Unknown compositor '{compositor}' (use one of {COMPOSITORS}).")
+        blur = blur or ("fast" if preview_dpi else "gaussian")
+        if blur not in BLUR_MODES:
+            raise ValueError(f"Unknown blur mode '{blur}' (use one of {BLUR_MODES}).")
+        if preview_dpi is not None and not 0 < preview_dpi <= DPI:
+            raise ValueError(f"preview_dpi must be between 1 and {DPI} (got {preview_dpi}).")
+        if template is not None and not template.matches(final_width, final_height, spine_width):
+            raise ValueError(f"Layout template {'x'.join(map(str, template.size))} does not match "
+                             f"{final_width}x{final_height} with a {spine_width} px spine.")
+        self.template = template
+        reset_peak_rss()
+        self.dpi = DPI  # layout units are px at print resolution, whatever the output
+        self.output_dpi = preview_dpi or DPI
+        self.scale = self.output_dpi / self.dpi
+        self.blur = blur
+        self.profiler = profiler
+        self.text_context = text_context or get_text_context()
+        self.parallel = parallel
+        self._pending_blocks = []  # text blocks rendering on the pool, in composite order (parallel=True)
+        with stage(profiler, "load_cover"):
+            self.cover, self.source_hash = load_cover(
+                cover_image_path, self._px(final_width), self._px(final_height),
+                mode="RGB" if low_memory else "RGBA",
+                bleed_px=self._px(int(BLEED_INCH * self.dpi)) if mirror_bleed else 0,
+                cache_dir=cache_dir,
+                memory_cache=memory_cache,
+            )
+        self._pristine = True  # no overlays drawn yet; palette can be memoized by source_hash
         self.final_width = final_width
         self.final_height = final_height
         self.spine_width = spine_width
-        self.dpi = 300
         self.debug = debug
+        self.compositor = compositor
+        self._overlay_ops = []  # queued cairo draws (compositor="cairo")
+        self.low_memory = low_memory
+        self.mirror_bleed = mirror_bleed
+        self.peak_rss_mb = None
+        self._pending_save = None  # Future of a background save()
+        self.background = None  # BackgroundPlan once prepare_background() has run
+        self.placement = None  # region_analysis.TextPlacement chosen by auto_layout
+
+    @classmethod
+    def from_template(cls, cover_image_path, template, **kwargs):
+        """Engine for a cover of the template's size, reusing its geometry and masks."""
+        return cls(cover_image_path, template.final_width, template.final_height, template.spine_width,
+                   template=template, **kwargs)
 
     def add_text(
         self,
@@ -30,75 +207,73 @@ class CoverLayoutEngine:
         letter_spacing=1.2,
         body_font="Merriweather",
         blur_bg=True,
+        gradient_direction="down",
+        gradient_easing="linear",
+        auto_fit=False,
+        auto_layout=False,
     ):
-        # === KDP SAFE ZONES ===
-        bleed = int(0.125 * self.dpi)
-        margin = int(0.25 * self.dpi)
-        inner_padding = int(0.1 * self.dpi)
-
-        back_width = (self.final_width - self.spine_width) // 2
-        front_width = back_width
-
-        # Back (left)
-        back_safe_x = bleed + margin
-        back_safe_y = bleed + margin
-        back_safe_width = back_width - (bleed + margin + inner_padding)
-        back_safe_height = self.final_height - (2 * bleed) - (2 * margin)
-
-        # Front (right)
-        front_safe_x = back_width + self.spine_width + bleed + margin
-        front_safe_y = bleed + margin
-        front_safe_width = front_width - (bleed + margin + inner_padding)
-        front_safe_height = self.final_height - (2 * bleed) - (2 * margin)
-
-        # Sub-areas
-        title_area_h = int(front_safe_height * 0.36)
-        subtitle_gap = int(0.04 * self.dpi)
-        subtitle_area_h = int(front_safe_height * 0.16)
-        desc_area_h = int(back_safe_height * 0.52)
+        """
+        auto_fit: ignore the fixed font sizes and use the largest size (within
+                  AUTO_FIT_SIZES) at which each block fits its box without
+                  splitting words; measured without rasterizing anything.
+        auto_layout: move the title block and the description to the calmest
+                  part of their safe zones and pick contrasting text colors and
+                  panel opacities from the art (see region_analysis.py); the
+                  given colors are ignored. The choice is kept in self.placement.
+        """
+        zones = self._safe_zones()
+        back_safe_x, back_safe_y, back_safe_width, _ = zones["back"]
+        front_safe_x, front_safe_y, front_safe_width, _ = zones["front"]
+        title_area_h, subtitle_area_h, desc_area_h = zones["areas"]
+        spine_box_w, spine_box_h = zones["spine_box"]
 
         front_title_box = (front_safe_width, title_area_h)
         front_subtitle_box = (front_safe_width, subtitle_area_h)
-        back_desc_box = (back_safe_width := back_safe_width, desc_area_h)  # noqa: F841
 
-        # Spine
-        spine_box_w = int(self.spine_width * 0.9)
-        spine_box_h = int(self.final_height * 0.8)
+        # === Background: placement, accent color, guides, gradient bars, blur ===
+        options = (gradient_bg, blur_bg, gradient_direction, gradient_easing, auto_layout)
+        if self.background is None:
+            placement = self._auto_placement(zones, gradient_bg) if auto_layout else None
+            accent_color = self._apply_background(zones, *options[:4], placement=placement)
+        elif self.background.options != options:
+            raise ValueError("add_text background options differ from the prepared background plan.")
+        else:
+            accent_color, placement = self.background.accent_color, self.background.placement
 
-        # === Debug Guides ===
-        if self.debug:
-            d = ImageDraw.Draw(self.cover, "RGBA")
-            # full safe areas
-            d.rectangle([front_safe_x, front_safe_y,
-                         front_safe_x + front_safe_width, front_safe_y + front_safe_height],
-                        outline=(0, 255, 0, 255), width=4)
-            d.rectangle([back_safe_x, back_safe_y,
-                         back_safe_x + back_safe_width, back_safe_y + back_safe_height],
-                        outline=(0, 0, 255, 255), width=4)
-            # spine
-            spine_cx = self.final_width // 2
-            d.rectangle([spine_cx - spine_box_w // 2, (self.final_height - spine_box_h) // 2,
-                         spine_cx + spine_box_w // 2, (self.final_height + spine_box_h) // 2],
-                        outline=(255, 0, 0, 255), width=4)
-
-        # === Background Enhancements ===
-        if gradient_bg:
-            self._add_gradient_bar((front_safe_x, front_safe_y,
-                                    front_safe_x + front_safe_width, front_safe_y + title_area_h))
-            self._add_gradient_bar((back_safe_x, back_safe_y,
-                                    back_safe_x + back_safe_width, back_safe_y + desc_area_h))
-        if blur_bg:
-            self._blur_area(front_safe_x, front_safe_y, front_safe_width, title_area_h)
-            self._blur_area(back_safe_x, back_safe_y, back_safe_width, desc_area_h)
-
-        # === Accent Line Color from Art ===
-        accent_color = self._extract_dominant_color()
+        title_y, desc_y = front_safe_y, back_safe_y
+        subtitle_color = spine_color = title_color
+        title_panel = desc_panel = None  # render_text defaults
+        if placement:
+            title_y, desc_y = placement.title_y, placement.desc_y
+            title_color, subtitle_color = placement.title_color, placement.subtitle_color
+            desc_color, spine_color = placement.desc_color, placement.spine_color
+            title_panel, desc_panel = placement.title_panel, placement.desc_panel
 
         # === Split Title / Subtitle ===
         main_title, subtitle = self._split_title_subtitle(title)
+        spine_text = (f"{main_title} • {author}" if author else main_title)
+
+        # === Auto-fit Typography ===
+        subtitle_font_size = max(12, int(title_font_size * 0.43))
+        if auto_fit:
+            boxes, styles = text_boxes(zones), fit_styles(letter_spacing, line_spacing)
+            with stage(self.profiler, "auto_fit"):
+                title_font_size = fit_font_size(
+                    main_title, font_family, boxes["title"], *AUTO_FIT_SIZES["title"], **styles["title"])
+                lo, hi = AUTO_FIT_SIZES["subtitle"]
+                subtitle_font_size = fit_font_size(
+                    subtitle, font_family, boxes["subtitle"], lo, max(lo, min(hi, int(title_font_size * 0.6))),
+                    **styles["subtitle"],
+                ) if subtitle.strip() else subtitle_font_size
+                desc_font_size = fit_font_size(
+                    description, body_font, boxes["desc"], *AUTO_FIT_SIZES["desc"], **styles["desc"])
+                spine_font_size = fit_font_size(
+                    spine_text, font_family, boxes["spine"], *AUTO_FIT_SIZES["spine"], **styles["spine"])
 
         # === Render Title (Front) ===
-        title_img = render_text(
+        self._place_text(
+            "title",
+            (front_safe_x, title_y),
             main_title,
             font_family,
             title_font_size,
@@ -113,25 +288,29 @@ class CoverLayoutEngine:
             text_shadow=text_shadow,
             rounded_bg=True,
             padding_px=18,
+            panel_opacity=title_panel,
         )
-        self.cover.paste(title_img, (front_safe_x, front_safe_y), title_img)
 
         # Decorative rule under title
-        self._draw_line(
-            x1=front_safe_x + 60,
-            y=front_safe_y + title_img.height + 18,
-            x2=front_safe_x + front_title_box[0] - 60,
-            color=accent_color,
-            thickness=5,
-        )
+        with stage(self.profiler, "rule"):
+            self._draw_line(
+                x1=front_safe_x + 60,
+                y=title_y + front_title_box[1] + 18,
+                x2=front_safe_x + front_title_box[0] - 60,
+                color=accent_color,
+                thickness=5,
+            )
 
         # === Render Subtitle (optional) ===
         if subtitle.strip():
-            sub_img = render_text(
+            sub_y = title_y + front_title_box[1] + 34  # below rule
+            self._place_text(
+                "subtitle",
+                (front_safe_x, sub_y),
                 subtitle,
                 font_family,
-                max(12, int(title_font_size * 0.43)),
-                title_color,
+                subtitle_font_size,
+                subtitle_color,
                 front_subtitle_box,
                 align="center",
                 valign="top",
@@ -143,11 +322,11 @@ class CoverLayoutEngine:
                 rounded_bg=False,
                 padding_px=8,
             )
-            sub_y = front_safe_y + title_img.height + 34  # below rule
-            self.cover.paste(sub_img, (front_safe_x, sub_y), sub_img)
 
         # === Render Description (Back) — justified ===
-        desc_img = render_text(
+        self._place_text(
+            "description",
+            (back_safe_x, desc_y),
             description,
             body_font,
             desc_font_size,
@@ -161,54 +340,274 @@ class CoverLayoutEngine:
             justify=True,
             text_shadow=text_shadow,
             padding_px=16,
+            panel_opacity=desc_panel,
         )
-        self.cover.paste(desc_img, (back_safe_x, back_safe_y), desc_img)
 
         # === Render Spine ===
-        spine_text = (f"{main_title} • {author}" if author else main_title)
-        spine_img = render_text(
+        # Rotated block is spine_box_w wide and spine_box_h tall, centered on the cover
+        spine_x = (self.final_width // 2) - (spine_box_w // 2)
+        spine_y = (self.final_height // 2) - (spine_box_h // 2)
+        self._place_text(
+            "spine",
+            (spine_x, spine_y),
             spine_text,
             font_family,
             spine_font_size,
-            title_color,
-            (spine_box_h, spine_box_w),  # swapped for rotation
+            spine_color,
+            (spine_box_h, spine_box_w),  # unrotated box; drawn turned 90° counter-clockwise
             align="center",
             valign="middle",
             italic=False,
-            rotated=True,
+            angle=90,
             small_caps=True,
             letter_spacing=1.6,
             text_shadow=text_shadow,
             add_bg=False,
         )
-        spine_x = (self.final_width // 2) - (spine_img.width // 2)
-        spine_y = (self.final_height // 2) - (spine_img.height // 2)
-        self.cover.paste(spine_img, (spine_x, spine_y), spine_img)
+        self._composite_blocks()
+
+    def prepare_background(self, gradient_bg=True, blur_bg=True, gradient_direction="down",
+                           gradient_easing="linear", auto_layout=False):
+        """
+        Apply the text-independent layers once and keep a copy of the result.
+        Later add_text() calls must use the same background options and reuse
+        the plan (and its accent color) instead of redrawing it. The plan
+        holds one extra copy of the cover.
+        """
+        if self.background is not None:
+            raise ValueError("The background plan has already been prepared.")
+        if not self._pristine or self._overlay_ops:
+            raise ValueError("prepare_background() must run before any text is added.")
+        options = (gradient_bg, blur_bg, gradient_direction, gradient_easing, auto_layout)
+        with stage(self.profiler, "prepare_background"):
+            zones = self._safe_zones()
+            placement = self._auto_placement(zones, gradient_bg) if auto_layout else None
+            accent_color = self._apply_background(zones, *options[:4], placement=placement)
+            self._flush_overlay()
+            self.background = BackgroundPlan(self.cover.copy(), accent_color, options, placement)
+        return self.background
+
+    def restore_background(self):
+        """Drop every text layer, returning the cover to the prepared background."""
+        if self.background is None:
+            raise ValueError("restore_background() needs prepare_background() first.")
+        # A background save() of the previous variant keeps encoding its own image
+        with stage(self.profiler, "restore_background"):
+            self.cover = self.background.cover.copy()
+            self._overlay_ops = []
+            self._pending_blocks = []
 
     # ===== Helpers =====
-    def _add_gradient_bar(self, box, opacity=175):
-        x1, y1, x2, y2 = box
-        bar = Image.new("RGBA", (x2 - x1, y2 - y1), (255, 255, 255, 0))
-        draw = ImageDraw.Draw(bar)
-        h = bar.height
-        for i in range(h):
-            alpha = int(opacity * (1 - (i / max(1, h))))
-            draw.line((0, i, bar.width, i), fill=(255, 255, 255, alpha))
-        self.cover.paste(bar, (x1, y1), bar)
+    def _safe_zones(self):
+        if self.template is not None:
+            return self.template.zones
+        return safe_zones(self.final_width, self.final_height, self.spine_width, self.dpi)
+
+    def _auto_placement(self, zones, gradient_bg):
+        """Analyse the untouched art and pick the calmest text positions (auto_layout)."""
+        with stage(self.profiler, "region_analysis"):
+            analysis = RegionAnalysis(self.cover, (self.final_width, self.final_height))
+            self.placement = plan_placement(analysis, zones, self.final_width, self.final_height, gradient_bg)
+        return self.placement
+
+    def _apply_background(self, zones, gradient_bg, blur_bg, gradient_direction, gradient_easing,
+                          placement=None):
+        """
+        Draw the text-independent layers; returns the accent color sampled from the art.
+        The gradient bars and blur follow the text blocks when a placement is given.
+        """
+        back_safe_x, back_safe_y, back_safe_width, back_safe_height = zones["back"]
+        front_safe_x, front_safe_y, front_safe_width, front_safe_height = zones["front"]
+        title_area_h, _, desc_area_h = zones["areas"]
+        spine_box_w, spine_box_h = zones["spine_box"]
+        title_y, desc_y = (placement.title_y, placement.desc_y) if placement else (front_safe_y, back_safe_y)
+
+        # === Accent Line Color from Art (sampled before any overlays) ===
+        with stage(self.profiler, "accent_color"):
+            accent_color = self._extract_dominant_color()
+        self._pristine = False
+
+        # === Debug Guides ===
+        if self.debug:
+            d = ImageDraw.Draw(self.cover, "RGBA")
+            guide = max(1, self._px(4))
+            # full safe areas
+            d.rectangle(self._px(front_safe_x, front_safe_y,
+                                 front_safe_x + front_safe_width, front_safe_y + front_safe_height),
+                        outline=(0, 255, 0, 255), width=guide)
+            d.rectangle(self._px(back_safe_x, back_safe_y,
+                                 back_safe_x + back_safe_width, back_safe_y + back_safe_height),
+                        outline=(0, 0, 255, 255), width=guide)
+            # spine
+            spine_cx = self.final_width // 2
+            d.rectangle(self._px(spine_cx - spine_box_w // 2, (self.final_height - spine_box_h) // 2,
+                                 spine_cx + spine_box_w // 2, (self.final_height + spine_box_h) // 2),
+                        outline=(255, 0, 0, 255), width=guide)
+
+        # === Background Enhancements ===
+        if gradient_bg:
+            with stage(self.profiler, "gradient_bars"):
+                self._add_gradient_bar((front_safe_x, title_y,
+                                        front_safe_x + front_safe_width, title_y + title_area_h),
+                                       direction=gradient_direction, easing=gradient_easing)
+                self._add_gradient_bar((back_safe_x, desc_y,
+                                        back_safe_x + back_safe_width, desc_y + desc_area_h),
+                                       direction=gradient_direction, easing=gradient_easing)
+        if blur_bg:
+            with stage(self.profiler, "blur"):
+                self._blur_areas([(front_safe_x, title_y, front_safe_width, title_area_h),
+                                  (back_safe_x, desc_y, back_safe_width, desc_area_h)])
+
+        return accent_color
+
+    def _place_text(self, name, origin, text, font_family, font_size, color, box_size, angle=0, **style):
+        """Render a text block with its top-left corner (after rotation) at `origin`."""
+        if self.compositor == "cairo":
+            self._overlay_ops.append(("text", origin, angle,
+                                      (text, font_family, font_size, color, box_size), style))
+            return
+        if self.parallel:
+            # Stage timings are recorded when the block is composited
+            future = _thread_pool().submit(_render_block, text, font_family, font_size, color, box_size,
+                                           angle=angle, scale=self.scale,
+                                           text_context=self.text_context, **style)
+            self._pending_blocks.append(("text", name, origin, future))
+            return
+        with stage(self.profiler, name, font_size=font_size):
+            img, offset = _render_block(text, font_family, font_size, color, box_size, angle=angle,
+                                        scale=self.scale, profiler=self.profiler,
+                                        text_context=self.text_context, **style)
+            with stage(self.profiler, "paste"):
+                self._paste_block(img, origin, offset)
+
+    def _paste_block(self, img, origin, offset):
+        x, y = self._px(*origin)
+        self.cover.paste(img, (x + offset[0], y + offset[1]), img)
+
+    def _composite_blocks(self):
+        """Paste blocks rendered on the pool (and rules queued between them) in their original order."""
+        pending, self._pending_blocks = self._pending_blocks, []
+        try:
+            for block in pending:
+                if block[0] == "line":
+                    self._draw_line(*block[1:])
+                    continue
+                _, name, origin, future = block
+                with stage(self.profiler, name, parallel=True):
+                    img, offset = future.result()
+                    self._paste_block(img, origin, offset)
+        finally:
+            for block in pending:
+                if block[0] == "text":
+                    block[3].cancel()
+
+    def _px(self, *values):
+        """Layout units (px at 300 DPI) to output pixels; a tuple for several values."""
+        if self.scale == 1:
+            px = tuple(int(v) for v in values)
+        else:
+            px = tuple(int(round(v * self.scale)) for v in values)
+        return px if len(px) > 1 else px[0]
+
+    def _flush_overlay(self):
+        """Draw queued cairo ops onto the cover in one surface round-trip."""
+        if not self._overlay_ops:
+            return
+        with stage(self.profiler, "flush_overlay", ops=len(self._overlay_ops)):
+            if self.low_memory:
+                self._flush_overlay_regions()
+                return
+            surface = image_to_surface(self.cover)
+            self.cover = None  # the surface is the only full-size copy while drawing
+            ctx = cairo.Context(surface)
+            ctx.scale(self.scale, self.scale)
+            for op in self._overlay_ops:
+                self._draw_op(ctx, op)
+            self._overlay_ops = []
+            self.cover = surface_to_image(surface)
+            surface.finish()
+
+    def _flush_overlay_regions(self):
+        """Low-memory flush: wrap only the bounding box of each op in a cairo surface."""
+        for op in self._overlay_ops:
+            x1, y1, x2, y2 = self._op_bounds(op)
+            x1, y1 = math.floor(x1 * self.scale), math.floor(y1 * self.scale)
+            x2, y2 = math.ceil(x2 * self.scale), math.ceil(y2 * self.scale)
+            box = (max(0, x1), max(0, y1), min(self.cover.width, x2), min(self.cover.height, y2))
+            if box[0] >= box[2] or box[1] >= box[3]:
+                continue
+            surface = image_to_surface(self.cover.crop(box))
+            ctx = cairo.Context(surface)
+            ctx.translate(-box[0], -box[1])
+            ctx.scale(self.scale, self.scale)
+            self._draw_op(ctx, op)
+            self.cover.paste(surface_to_image(surface), box[:2])
+            surface.finish()
+        self._overlay_ops = []
+
+    @staticmethod
+    def _op_bounds(op):
+        if op[0] == "text":
+            _, (x, y), angle, args, _style = op
+            w, h = rotated_size(args[4], angle)
+            return x, y, x + math.ceil(w), y + math.ceil(h)
+        _, x1, y, x2, _color, thickness = op
+        return x1, y - thickness, x2, y + thickness
+
+    def _draw_op(self, ctx, op):
+        kind = op[0]
+        ctx.save()
+        if kind == "text":
+            _, (x, y), angle, args, style = op
+            ctx.translate(x, y)
+            if angle % 360:
+                ctx.transform(rotation_matrix(args[4], angle))
+            draw_text(ctx, *args, text_context=self.text_context, **style)
+        elif kind == "line":
+            _, x1, y, x2, color, thickness = op
+            r, g, b = color[:3]
+            ctx.set_source_rgb(r / 255.0, g / 255.0, b / 255.0)
+            ctx.set_line_width(thickness)
+            ctx.move_to(x1, y)
+            ctx.line_to(x2, y)
+            ctx.stroke()
+        ctx.restore()
+
+    def _add_gradient_bar(self, box, opacity=175, direction="down", easing="linear"):
+        self._flush_overlay()
+        x1, y1, x2, y2 = self._px(*box)
+        # Cached alpha ramp; white is blended in through it without a per-row loop
+        masks = self.template.gradient_mask if self.template is not None else gradient_mask
+        mask = masks(x2 - x1, y2 - y1, opacity, direction, easing)
+        white = (255,) * len(self.cover.getbands())
+        self.cover.paste(white, (x1, y1, x2, y2), mask)
 
     def _blur_area(self, x, y, w, h):
-        region = self.cover.crop((x, y, x + w, y + h))
-        self.cover.paste(region.filter(ImageFilter.GaussianBlur(12)), (x, y))
+        self._flush_overlay()
+        box = self._px(x, y, x + w, y + h)
+        region = self.cover.crop(box)
+        self.cover.paste(blur_image(region, BLUR_RADIUS * self.scale, self.blur), box[:2])
+
+    def _blur_areas(self, areas):
+        """Blur non-overlapping (x, y, w, h) areas; concurrently when parallel=True."""
+        if not self.parallel or len(areas) < 2:
+            for area in areas:
+                self._blur_area(*area)
+            return
+        self._flush_overlay()
+        boxes = [self._px(x, y, x + w, y + h) for x, y, w, h in areas]
+        radius = BLUR_RADIUS * self.scale
+        regions = _thread_pool().map(lambda box: blur_image(self.cover.crop(box), radius, self.blur), boxes)
+        for box, region in zip(boxes, list(regions)):
+            self.cover.paste(region, box[:2])
 
     def _extract_dominant_color(self):
-        small = self.cover.resize((120, 120))
-        pixels = list(small.getdata())
-        # Count colors, pick the darkest “common” to avoid white
-        common = Counter(pixels).most_common(40)
-        for color, _ in common:
-            if sum(color[:3]) < 680:  # push away near-white
-                return color
-        return (45, 45, 45)
+        # Bucketed palette, most common first; skip near-white so the rule stays visible
+        self._flush_overlay()
+        cache_key = (f"{self.source_hash}-{self.cover.width}x{self.cover.height}-b{int(self.mirror_bleed)}"
+                     if self._pristine else None)  # mirrored bleed changes the pixels too
+        palette = extract_palette(self.cover, cache_key=cache_key)
+        return pick_accent_color(palette)
 
     def _split_title_subtitle(self, text: str):
         # Try typical splitters, keep the first as title, the rest as subtitle
@@ -220,8 +619,92 @@ class CoverLayoutEngine:
         return text, ""  # no subtitle
 
     def _draw_line(self, x1, y, x2, color, thickness=4):
+        if self.compositor == "cairo":
+            self._overlay_ops.append(("line", x1, y, x2, color, thickness))
+            return
+        if self._pending_blocks:
+            # Keep the rule in order with the text blocks still rendering
+            self._pending_blocks.append(("line", x1, y, x2, color, thickness))
+            return
         d = ImageDraw.Draw(self.cover)
-        d.line((x1, y, x2, y), fill=color, width=thickness)
+        d.line(self._px(x1, y, x2, y), fill=color, width=max(1, self._px(thickness)))
+
+    def save(self, path, pdf_art="jpeg", profile=None, background=False):
+        """
+        Write the cover. A ".pdf" path produces a print PDF (see save_pdf);
+        anything else is a raster image.
+
+        profile:    name from output_profiles.OUTPUT_PROFILES; None keeps the
+                    format implied by the extension with PIL defaults
+        background: encode on a background thread and return its Future so
+                    the caller can start on the next cover; wait_saved()
+                    blocks until the file is written. The engine must not be
+                    drawn on again until then.
+        """
+        if os.path.splitext(path)[1].lower() == ".pdf":
+            with stage(self.profiler, "save_pdf"):
+                self.save_pdf(path, art=pdf_art)
+            return None
+        with stage(self.profiler, "save"):
+            self._flush_overlay()
+            if background:
+                self._pending_save = encode_image_async(self.cover, path, profile, self.output_dpi)
+                self.peak_rss_mb = self._peak_rss()  # the render's peak; wait_saved() adds the encode
+                return self._pending_save
+            with stage(self.profiler, "encode", profile=profile):
+                encode_image(self.cover, path, profile, self.output_dpi)
+        self.peak_rss_mb = self._peak_rss()
+        return None
+
+    def wait_saved(self):
+        """Block until a background save() has finished, re-raising its error."""
+        if self._pending_save is None:
+            return
+        future, self._pending_save = self._pending_save, None
+        with stage(self.profiler, "encode_wait"):
+            future.result()
+        self.peak_rss_mb = self._peak_rss()
+
+    def save_pdf(self, path, art="jpeg", jpeg_quality=95):
+        """
+        Write a PDF page sized to the full cover (the art at self.output_dpi).
+
+        The artwork is embedded once as an image ("jpeg": DCT-compressed
+        passthrough, "lossless": Flate) and every op still queued by the cairo
+        compositor (panels, shadows, text, rules, spine) is drawn as vectors,
+        so text stays sharp with subsetted embedded fonts. With the "pil"
+        compositor the text is already part of the raster art.
+        """
+        if art not in ("jpeg", "lossless"):
+            raise ValueError(f"Unknown PDF art mode '{art}' (use 'jpeg' or 'lossless').")
+        art_scale = 72.0 / self.output_dpi
+        pdf = cairo.PDFSurface(path, self.cover.width * art_scale, self.cover.height * art_scale)
+        ctx = cairo.Context(pdf)
+
+        art_surface = image_to_surface(self.cover)
+        if art == "jpeg":
+            buf = io.BytesIO()
+            self.cover.convert("RGB").save(buf, format="JPEG", quality=jpeg_quality, subsampling=0)
+            art_surface.set_mime_data(cairo.MIME_TYPE_JPEG, buf.getvalue())
+        ctx.save()
+        ctx.scale(art_scale, art_scale)
+        ctx.set_source_surface(art_surface, 0, 0)
+        ctx.paint()
+        ctx.restore()
+
+        # Ops are in layout units (px at self.dpi)
+        ctx.scale(72.0 / self.dpi, 72.0 / self.dpi)
+
+        # Queued ops stay queued, so a raster save() afterwards still includes them
+        for op in self._overlay_ops:
+            self._draw_op(ctx, op)
+        pdf.finish()
+        art_surface.finish()
+        self.peak_rss_mb = self._peak_rss()
 
-    def save(self, path):
-        self.cover.save(path, dpi=(self.dpi, self.dpi))
+    def _peak_rss(self):
+        """Process peak RSS for this render; each profiled stage resets the kernel mark."""
+        peak = peak_rss_mb()
+        if self.profiler is not None:
+            peak = max([peak] + [r["peak_rss_mb"] for r in self.profiler.records])
+        return peak
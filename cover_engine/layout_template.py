@@ -0,0 +1,166 @@
+"""
+Precomputed layout for one trim size and spine width, shared by a series.
+
+    template = LayoutTemplate.for_book(page_count=300, paper="cream", trim=(6, 9))
+    template.save("series_6x9.json")
+
+    template = load_template("series_6x9.json")  # once per worker
+    engine = CoverLayoutEngine.from_template("art.png", template)
+
+A template holds the full cover size, spine width, KDP safe zones and text
+boxes in px at 300 DPI, derived from config.py (trim, bleed, safe margin and
+spine thickness per page), and keeps the gradient-bar masks of every cover
+drawn with it, so a series on one trim computes its geometry and masks once
+instead of once per cover. It serializes to JSON (size and book details
+only): safe zones are recomputed with geometry.safe_zones on load, so a
+render always uses the same boxes as validation and the fit check, and masks
+are rebuilt on first use in each process (see warm()).
+
+Run as a script to write a template:
+    python layout_template.py --page_count 300 --paper cream --trim 6x9 --out series_6x9.json
+"""
+import argparse
+import json
+import os
+from functools import lru_cache
+
+from config import DPI, BLEED_INCH, TRIM_WIDTH_INCH, TRIM_HEIGHT_INCH, SPINE_INCH_PER_PAGE
+from geometry import safe_zones, text_boxes
+
+TEMPLATE_VERSION = 1
+
+
+class LayoutTemplate:
+    """Geometry (and, once built, gradient masks) for covers of one size."""
+
+    def __init__(self, final_width, final_height, spine_width, dpi=DPI, trim=None, page_count=None, paper=None):
+        self.final_width = final_width
+        self.final_height = final_height
+        self.spine_width = spine_width
+        self.dpi = dpi
+        self.trim = tuple(trim) if trim else None  # (width, height) in inches, when known
+        self.page_count = page_count
+        self.paper = paper
+        self.zones = safe_zones(final_width, final_height, spine_width, dpi)
+        self.boxes = text_boxes(self.zones)
+        self._masks = {}
+
+    @classmethod
+    def for_trim(cls, trim=(TRIM_WIDTH_INCH, TRIM_HEIGHT_INCH), spine_width_inch=0.0, bleed_inch=BLEED_INCH,
+                 dpi=DPI, **info):
+        """Full wrap for a trim size (inches): back + spine + front, bled on every edge."""
+        trim_w, trim_h = trim
+        width = round((2 * trim_w + spine_width_inch + 2 * bleed_inch) * dpi)
+        height = round((trim_h + 2 * bleed_inch) * dpi)
+        return cls(width, height, round(spine_width_inch * dpi), dpi, trim=trim, **info)
+
+    @classmethod
+    def for_book(cls, page_count, paper="white", trim=(TRIM_WIDTH_INCH, TRIM_HEIGHT_INCH), bleed_inch=BLEED_INCH,
+                 dpi=DPI):
+        """Full wrap for a book: the spine width follows from the page count and KDP paper type."""
+        if paper not in SPINE_INCH_PER_PAGE:
+            raise ValueError(f"Unknown paper type '{paper}' (use one of {tuple(SPINE_INCH_PER_PAGE)}).")
+        return cls.for_trim(trim, page_count * SPINE_INCH_PER_PAGE[paper], bleed_inch, dpi,
+                            page_count=page_count, paper=paper)
+
+    @property
+    def size(self):
+        """(final_width, final_height, spine_width) in px."""
+        return self.final_width, self.final_height, self.spine_width
+
+    def matches(self, final_width, final_height, spine_width, dpi=DPI):
+        return self.size == (final_width, final_height, spine_width) and self.dpi == dpi
+
+    def gradient_mask(self, width, height, opacity=175, direction="down", easing="linear"):
+        """image_utils.gradient_mask, kept for the template's lifetime; treat as read-only."""
+        key = (width, height, opacity, direction, easing)
+        mask = self._masks.get(key)
+        if mask is None:
+            from image_utils import gradient_mask
+
+            mask = self._masks[key] = gradient_mask(*key)
+        return mask
+
+    def warm(self, scale=1.0, opacity=175, direction="down", easing="linear"):
+        """Build the title and description gradient masks for covers rendered at `scale`."""
+        title_h, _, desc_h = self.zones["areas"]
+        for width, height in ((self.zones["front"][2], title_h), (self.zones["back"][2], desc_h)):
+            if scale != 1:
+                width, height = round(width * scale), round(height * scale)
+            self.gradient_mask(width, height, opacity, direction, easing)
+        return self
+
+    def to_dict(self):
+        return {
+            "version": TEMPLATE_VERSION,
+            "final_width": self.final_width,
+            "final_height": self.final_height,
+            "spine_width": self.spine_width,
+            "dpi": self.dpi,
+            "trim": list(self.trim) if self.trim else None,
+            "page_count": self.page_count,
+            "paper": self.paper,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        if data.get("version") != TEMPLATE_VERSION:
+            raise ValueError(f"Unsupported layout template version {data.get('version')!r} "
+                             f"(expected {TEMPLATE_VERSION}).")
+        # Zones written by older versions are ignored: they are always recomputed from the size
+        return cls(data["final_width"], data["final_height"], data["spine_width"], data["dpi"],
+                   trim=data.get("trim"), page_count=data.get("page_count"), paper=data.get("paper"))
+
+    def save(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    def __getstate__(self):
+        # Masks are cheap to rebuild and large to ship to worker processes
+        state = dict(self.__dict__)
+        state["_masks"] = {}
+        return state
+
+
+@lru_cache(maxsize=8)
+def _load(path: str, _mtime_ns: int):
+    with open(path, encoding="utf-8") as f:
+        return LayoutTemplate.from_dict(json.load(f))
+
+
+def load_template(path: str):
+    """Load a saved template; repeated loads in one process share one instance (and its masks)."""
+    path = os.path.abspath(path)
+    return _load(path, os.stat(path).st_mtime_ns)
+
+
+def _parse_trim(value: str):
+    try:
+        width, height = (float(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Trim must look like 6x9 (inches), got {value!r}.")
+    return width, height
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a layout template for a trim size and page count")
+    parser.add_argument("--page_count", type=int, required=True, help="Interior page count")
+    parser.add_argument("--paper", type=str, default="white", choices=list(SPINE_INCH_PER_PAGE),
+                        help="KDP paper type (sets the spine thickness per page)")
+    parser.add_argument("--trim", type=_parse_trim, default=(TRIM_WIDTH_INCH, TRIM_HEIGHT_INCH),
+                        help=f"Trim size in inches (default {TRIM_WIDTH_INCH:g}x{TRIM_HEIGHT_INCH:g})")
+    parser.add_argument("--bleed", type=float, default=BLEED_INCH, help="Bleed in inches")
+    parser.add_argument("--out", type=str, required=True, help="Template JSON path")
+    args = parser.parse_args()
+
+    template = LayoutTemplate.for_book(args.page_count, args.paper, args.trim, args.bleed)
+    template.save(args.out)
+    print(f"✅ {template.final_width}x{template.final_height} px, spine {template.spine_width} px "
+          f"— template saved at: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
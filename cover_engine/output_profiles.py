@@ -0,0 +1,118 @@
+"""
+Output encoder profiles for raster covers.
+
+Each profile names a PIL format, its save parameters, and whether the cover
+is flattened to RGB first (KDP does not use alpha, and dropping it saves a
+quarter of the pixel data to compress).
+
+Run as a script to benchmark every profile on an existing image:
+    python output_profiles.py final_cover.png [--profiles png png_fast jpeg]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+OUTPUT_PROFILES = {
+    # PIL defaults, i.e. what save() always did (zlib level 6, keeps alpha)
+    "png": {"format": "PNG", "params": {}, "flatten": False},
+    # Low zlib effort: much faster, somewhat larger files
+    "png_fast": {"format": "PNG", "params": {"compress_level": 1}, "flatten": False},
+    # png_fast without the alpha channel: the quickest print-ready PNG
+    "png_rgb": {"format": "PNG", "params": {"compress_level": 1}, "flatten": True},
+    # Smallest PNG; slowest to write
+    "png_optimized": {"format": "PNG", "params": {"optimize": True}, "flatten": True},
+    # Visually lossless JPEG, no chroma subsampling
+    "jpeg": {"format": "JPEG", "params": {"quality": 95, "subsampling": 0}, "flatten": True},
+    # LZW TIFF, accepted by most print pipelines
+    "tiff": {"format": "TIFF", "params": {"compression": "tiff_lzw"}, "flatten": True},
+}
+
+EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "TIFF": ".tif"}
+# Every extension a file of each format may be written to
+FORMAT_EXTENSIONS = {"PNG": (".png",), "JPEG": (".jpg", ".jpeg"), "TIFF": (".tif", ".tiff")}
+
+# Shared by every engine in the process; PIL releases the GIL while encoding
+_executor = None
+
+
+def get_profile(name: str):
+    if name not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile '{name}' (use one of {tuple(OUTPUT_PROFILES)}).")
+    return OUTPUT_PROFILES[name]
+
+
+def extension_error(name: str, path: str):
+    """Message if the profile's format does not match the extension of `path`, else None."""
+    spec = get_profile(name)
+    ext = os.path.splitext(path)[1].lower()
+    if ext in FORMAT_EXTENSIONS[spec["format"]]:
+        return None
+    return (f"Output profile '{name}' writes {spec['format']}, which does not match the output "
+            f"extension '{ext}' (use {' or '.join(FORMAT_EXTENSIONS[spec['format']])}).")
+
+
+def encode_image(image, path, profile=None, dpi=300):
+    """
+    Save `image` to `path` using the named profile. With profile=None the
+    format follows the file extension and PIL defaults apply. Raises
+    ValueError if the profile's format does not match the extension.
+    """
+    if profile is None:
+        image.save(path, dpi=(dpi, dpi))
+        return path
+    spec = get_profile(profile)
+    error = extension_error(profile, path)
+    if error:
+        raise ValueError(error)
+    if spec["flatten"] and image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(path, format=spec["format"], dpi=(dpi, dpi), **spec["params"])
+    return path
+
+
+def encode_image_async(image, path, profile=None, dpi=300):
+    """
+    Encode on a background thread and return a concurrent.futures.Future.
+    The caller must not modify `image` until the future is done.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cover-encode")
+    return _executor.submit(encode_image, image, path, profile, dpi)
+
+
+def benchmark_profiles(image, profiles=None, dpi=300, repeat=1):
+    """Encode `image` with each profile into a temp dir; return time and size per profile."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in profiles or OUTPUT_PROFILES:
+            path = os.path.join(tmp, name + EXTENSIONS[get_profile(name)["format"]])
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                encode_image(image, path, name, dpi)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({"profile": name, "seconds": round(best, 4), "bytes": os.path.getsize(path)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark output encoder profiles")
+    parser.add_argument("image", type=str, help="Rendered cover to re-encode")
+    parser.add_argument("--profiles", nargs="+", choices=list(OUTPUT_PROFILES), default=None)
+    parser.add_argument("--repeat", type=int, default=1, help="Encodes per profile (best time is kept)")
+    args = parser.parse_args()
+
+    from PIL import Image
+
+    image = Image.open(args.image)
+    image.load()
+    print(json.dumps(benchmark_profiles(image, args.profiles, repeat=args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
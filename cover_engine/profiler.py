@@ -0,0 +1,88 @@
+"""
+Opt-in per-stage timing and memory instrumentation.
+
+    profiler = StageProfiler(callback=print)
+    engine = CoverLayoutEngine(..., profiler=profiler)
+    ...
+    profiler.write_json("final_cover.png.profile.json")
+
+Each stage records wall time, RSS before/after, and the peak RSS reached
+while it ran (Linux resets the kernel high-water mark per stage). With
+trace_python=True the Python-heap peak from tracemalloc is recorded too;
+PIL, cairo and Pango allocate outside the Python heap, so RSS is the number
+to watch for image buffers.
+"""
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from memory_utils import reset_peak_rss, peak_rss_mb, current_rss_mb
+
+
+class StageProfiler:
+    def __init__(self, callback=None, trace_python=False):
+        """
+        callback:     called with each stage record as the stage ends
+        trace_python: also track the Python-heap peak with tracemalloc (slower)
+        """
+        self.callback = callback
+        self.trace_python = trace_python
+        self.records = []
+        self._stack = []
+        self._started = time.perf_counter()
+        if trace_python and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, **info):
+        """Time the enclosed block; nested stages are named "parent.child"."""
+        full_name = ".".join([frame["name"] for frame in self._stack] + [name])
+        frame = {"name": name, "child_peak_rss": 0.0, "child_py_peak": 0}
+        self._stack.append(frame)
+
+        rss_before = current_rss_mb()
+        reset_peak_rss()
+        if self.trace_python:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            record = {
+                "name": full_name,
+                "seconds": round(seconds, 5),
+                "rss_before_mb": rss_before,
+                "rss_after_mb": current_rss_mb(),
+                # Children reset the high-water mark, so fold their peaks back in
+                "peak_rss_mb": max(peak_rss_mb(), frame["child_peak_rss"]),
+            }
+            if self.trace_python:
+                py_peak = max(tracemalloc.get_traced_memory()[1], frame["child_py_peak"])
+                record["python_peak_kb"] = round(py_peak / 1024, 1)
+            record.update(info)
+            if self._stack:
+                parent = self._stack[-1]
+                parent["child_peak_rss"] = max(parent["child_peak_rss"], record["peak_rss_mb"])
+                parent["child_py_peak"] = max(parent["child_py_peak"], record.get("python_peak_kb", 0) * 1024)
+            self.records.append(record)
+            if self.callback:
+                self.callback(record)
+
+    def to_dict(self):
+        return {
+            "total_seconds": round(time.perf_counter() - self._started, 5),
+            "peak_rss_mb": max((r["peak_rss_mb"] for r in self.records), default=peak_rss_mb()),
+            "stages": self.records,
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def stage(profiler, name, **info):
+    """profiler.stage(name) when profiling, else a no-op context manager."""
+    return profiler.stage(name, **info) if profiler is not None else nullcontext()
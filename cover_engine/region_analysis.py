@@ -0,0 +1,145 @@
+"""
+Integral-image analysis of cover art, for placing text where the art is calm.
+
+RegionAnalysis downsamples the cover once and builds summed-area tables of
+luminance, squared luminance and edge energy, so the mean brightness,
+standard deviation and busyness of any box are answered in O(1), however
+many candidate boxes are tried. Boxes are given in layout units (px at
+300 DPI), whatever resolution the cover was loaded at.
+
+plan_placement() scans candidate title and description positions inside the
+KDP safe zones and returns the calmest ones, with a contrasting text color
+(color_utils.get_contrast_color) and a panel opacity for each block.
+"""
+import math
+from collections import namedtuple
+from itertools import accumulate
+
+from PIL import ImageFilter
+
+from color_utils import get_contrast_color
+
+ANALYSIS_WIDTH = 256     # cells across the full wrap
+AUTO_LAYOUT_STEPS = 24   # candidate positions tried per block
+PANEL_OPACITY = (0.35, 0.9)  # white panel opacity over calm ... busy art
+BUSY = 100.0             # busyness at which panels reach full opacity
+GRADIENT_LIGHTEN = 175 / 255 / 2  # mean whitening of a linear gradient bar (see _add_gradient_bar)
+
+RegionStats = namedtuple("RegionStats", ["luminance", "std", "edges", "busyness"])
+TextPlacement = namedtuple("TextPlacement", ["title_y", "desc_y", "title_color", "subtitle_color",
+                                             "desc_color", "spine_color", "title_panel", "desc_panel"])
+
+
+def _integral(values, width, height):
+    """Flat (width + 1) x (height + 1) summed-area table of a row-major list."""
+    previous = [0] * (width + 1)
+    table = list(previous)
+    for y in range(height):
+        runs = accumulate(values[y * width:(y + 1) * width])
+        row = [0]
+        row.extend(above + run for above, run in zip(previous[1:], runs))
+        table.extend(row)
+        previous = row
+    return table
+
+
+class RegionAnalysis:
+    """Summed-area tables of one cover's luminance, variance and edge energy."""
+
+    def __init__(self, image, layout_size, width=ANALYSIS_WIDTH):
+        layout_w, layout_h = layout_size
+        width = max(1, min(width, image.width))
+        height = max(1, round(image.height * width / image.width))
+        small = image.convert("L").resize((width, height), reducing_gap=2.0)
+        luma = list(small.getdata())
+        edges = list(small.filter(ImageFilter.FIND_EDGES).getdata())
+
+        self.width, self.height = width, height
+        self._sx, self._sy = width / layout_w, height / layout_h  # cells per layout unit
+        self._luma = _integral(luma, width, height)
+        self._square = _integral([v * v for v in luma], width, height)
+        self._edges = _integral(edges, width, height)
+
+    def _cells(self, box):
+        x, y, w, h = box
+        x1 = min(self.width - 1, max(0, math.floor(x * self._sx)))
+        y1 = min(self.height - 1, max(0, math.floor(y * self._sy)))
+        x2 = max(x1 + 1, min(self.width, math.ceil((x + w) * self._sx)))
+        y2 = max(y1 + 1, min(self.height, math.ceil((y + h) * self._sy)))
+        return x1, y1, x2, y2
+
+    def _sum(self, table, x1, y1, x2, y2):
+        stride = self.width + 1
+        return (table[y2 * stride + x2] - table[y1 * stride + x2]
+                - table[y2 * stride + x1] + table[y1 * stride + x1])
+
+    def stats(self, box):
+        """RegionStats of a layout-unit box (x, y, w, h); busyness is std + mean edge energy."""
+        x1, y1, x2, y2 = self._cells(box)
+        count = (x2 - x1) * (y2 - y1)
+        mean = self._sum(self._luma, x1, y1, x2, y2) / count
+        variance = max(0.0, self._sum(self._square, x1, y1, x2, y2) / count - mean * mean)
+        std = math.sqrt(variance)
+        edges = self._sum(self._edges, x1, y1, x2, y2) / count
+        return RegionStats(mean, std, edges, std + edges)
+
+    def calmest(self, boxes):
+        """The least busy box of `boxes` (the first one on ties)."""
+        return min(boxes, key=lambda box: self.stats(box).busyness)
+
+
+def _candidates(x, y, w, h, block_h, steps=AUTO_LAYOUT_STEPS):
+    """Boxes of height block_h sliding top to bottom through the zone (x, y, w, h)."""
+    travel = max(0, h - block_h)
+    count = min(steps, travel + 1)
+    return [(x, y + (travel * i // (count - 1) if count > 1 else 0), w, block_h) for i in range(count)]
+
+
+def _panel_opacity(stats):
+    low, high = PANEL_OPACITY
+    return round(low + (high - low) * min(1.0, stats.busyness / BUSY), 3)
+
+
+def _text_color(stats, panel=0.0, lighten=0.0):
+    """Black or white, whichever contrasts with the art as seen through a gradient bar and a white panel."""
+    shade = stats.luminance + (255 - stats.luminance) * lighten
+    shade = panel * 255 + (1 - panel) * shade
+    return get_contrast_color((shade, shade, shade))
+
+
+def plan_placement(analysis, zones, final_width, final_height, gradient_bg=True):
+    """
+    Pick the calmest title and description positions inside the safe zones.
+
+    The title block (title box, rule and subtitle box) slides down the front
+    safe zone and the description box down the back one; each block gets a
+    panel opacity that grows with the busyness of the art under it and a
+    contrasting text color. Returns a TextPlacement (y in layout units).
+    """
+    front_x, front_y, front_w, front_h = zones["front"]
+    back_x, back_y, back_w, back_h = zones["back"]
+    title_h, subtitle_h, desc_h = zones["areas"]
+    spine_w, spine_h = zones["spine_box"]
+    lighten = GRADIENT_LIGHTEN if gradient_bg else 0.0
+
+    # Title, rule and subtitle move together (see add_text: the subtitle starts 34 px below the title)
+    group_h = title_h + 34 + subtitle_h
+    group = analysis.calmest(_candidates(front_x, front_y, front_w, front_h, group_h))
+    title_y = group[1]
+    desc_y = analysis.calmest(_candidates(back_x, back_y, back_w, back_h, desc_h))[1]
+
+    title = analysis.stats((front_x, title_y, front_w, title_h))
+    subtitle = analysis.stats((front_x, title_y + title_h + 34, front_w, subtitle_h))
+    desc = analysis.stats((back_x, desc_y, back_w, desc_h))
+    spine = analysis.stats(((final_width - spine_w) // 2, (final_height - spine_h) // 2, spine_w, spine_h))
+    title_panel, desc_panel = _panel_opacity(title), _panel_opacity(desc)
+    return TextPlacement(
+        title_y=title_y,
+        desc_y=desc_y,
+        title_color=_text_color(title, title_panel, lighten),
+        subtitle_color=_text_color(subtitle),
+        desc_color=_text_color(desc, desc_panel, lighten),
+        spine_color=_text_color(spine),
+        title_panel=title_panel,
+        desc_panel=desc_panel,
+    )
@@ -0,0 +1,237 @@
+"""
+Content-addressed disk cache of finished covers.
+
+A render is keyed by the SHA-1 of the cover art bytes plus everything else
+that can change its pixels: every job field (sizes, colors, flags, output
+format and encoder profile), the resolved fonts and their installed styles,
+the professional text style, the contents of the layout template (if any),
+the versions of Pillow / pycairo / PyGObject and a fingerprint of the
+engine's own source files, so a code change never serves a stale cover.
+Fields that cannot change the output (paths, profiling, parallel, caches)
+are left out.
+
+Entries are plain files named by their key. A hit copies the stored file to
+the requested output and bumps its mtime, which doubles as the LRU clock:
+once the cache grows past max_bytes the least recently used entries are
+deleted. Writes are atomic, so several worker processes (or threads) can share
+one cache.
+
+    cache = RenderCache("~/.cache/fbnp_cover_engine/renders", max_mb=2048)
+    key = cache.key(job, title_font, body_font)
+    if not cache.fetch(key, job["output"]):
+        render_job(job, title_font, body_font)
+        cache.store(key, job["output"])
+    print(cache.report())
+
+Run as a script to inspect or clear a cache directory:
+    python render_cache.py ~/.cache/fbnp_cover_engine/renders [--clear]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from functools import lru_cache
+from importlib import metadata
+
+from jobs import PRO_TEXT_STYLE
+from layout_template import load_template
+
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Sources whose changes can alter a rendered cover
+ENGINE_SOURCES = ("_init_.py", "config.py", "geometry.py", "jobs.py", "layout_engine.py", "text_renderer.py",
+                  "image_utils.py", "color_utils.py", "region_analysis.py", "output_profiles.py",
+                  "layout_template.py")
+LIBRARIES = ("Pillow", "pycairo", "PyGObject")
+# Temp files older than this are leftovers of a crashed store, not one in progress
+STALE_TMP_SECONDS = 600
+# Job fields that never change the output pixels
+UNCACHED_FIELDS = ("cover", "output", "profile", "profile_out", "ingest_cache", "parallel",
+                   "render_cache", "render_cache_mb")
+
+
+@lru_cache(maxsize=1)
+def engine_fingerprint():
+    """Hash of the engine sources and rendering library versions."""
+    digest = hashlib.sha1()
+    for name in ENGINE_SOURCES:
+        try:
+            with open(os.path.join(ENGINE_DIR, name), "rb") as f:
+                digest.update(name.encode() + b"\0" + f.read())
+        except OSError:
+            digest.update(name.encode() + b"\0missing")
+    for library in LIBRARIES:
+        try:
+            version = metadata.version(library)
+        except metadata.PackageNotFoundError:
+            version = "missing"
+        digest.update(f"{library}={version}".encode())
+    return digest.hexdigest()
+
+
+def file_sha1(path: str):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Size-bounded, LRU-evicted cache of rendered covers in one directory."""
+
+    def __init__(self, directory: str, max_mb: int = 2048):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self._bytes = None  # running total; rescanned whenever eviction runs
+        self._lock = threading.RLock()  # one cache may serve several render threads
+
+    def key(self, job: dict, title_font: str, body_font: str):
+        """Cache key for a normalized job rendered with the given fonts."""
+        params = {k: v for k, v in job.items() if k not in UNCACHED_FIELDS}
+        params.update(title_font=title_font, body_font=body_font, style=PRO_TEXT_STYLE)
+        if job["template"]:
+            # The template's contents, not its path: an edited file must not serve stale covers
+            params["template"] = load_template(job["template"]).to_dict()
+        return self.key_for(job["cover"], job["output"], params, (title_font, body_font))
+
+    def key_for(self, cover: str, output: str, params: dict, fonts=()):
+        """
+        Cache key for rendering `cover` into `output` with arbitrary engine and
+        add_text parameters (JSON-serializable); `fonts` are the families used.
+        """
+        from font_index import get_font_index
+
+        index = get_font_index()
+        payload = {
+            "cover_sha1": file_sha1(cover),
+            "format": os.path.splitext(output)[1].lower(),
+            "params": params,
+            "fonts": {font: index.styles(font) for font in fonts},
+            "engine": engine_fingerprint(),
+        }
+        blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=list).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest() + payload["format"]
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, key)
+
+    def fetch(self, key: str, output: str):
+        """Copy a cached render to `output`; returns True on a hit."""
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, output)
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, output: str):
+        """Add a finished render to the cache, evicting old entries if over the cap."""
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # unique per process and thread
+        shutil.copyfile(output, tmp)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stored += 1
+            if self._bytes is None:
+                self._bytes = self._scan()[1]
+            else:
+                self._bytes += os.path.getsize(path)
+            if self._bytes > self.max_bytes:
+                self.evict()
+
+    def _scan(self):
+        """Return ([(mtime, size, path), ...] oldest first, total bytes)."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # evicted by another process meanwhile
+            entries.append((st.st_mtime_ns, st.st_size, path))
+        entries.sort()
+        return entries, sum(size for _mtime, size, _path in entries)
+
+    def _remove_stale_tmp(self, max_age=STALE_TMP_SECONDS):
+        """Delete temp files older than max_age seconds, left by a worker that died mid-store."""
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.directory):
+            if not name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass  # finished (renamed) or removed by another process meanwhile
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes, and stale temp files."""
+        with self._lock:
+            self._remove_stale_tmp()
+            entries, total = self._scan()
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self.evicted += 1
+                except OSError:
+                    pass
+                total -= size
+            self._bytes = total
+
+    def clear(self):
+        self._remove_stale_tmp()
+        for _mtime, _size, path in self._scan()[0]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._bytes = 0
+
+    def report(self):
+        entries, total = self._scan()
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "stored": self.stored,
+            "evicted": self.evicted,
+            "entries": len(entries),
+            "mb": round(total / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear a render cache")
+    parser.add_argument("directory", type=str, help="Render cache directory")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached render")
+    args = parser.parse_args()
+
+    cache = RenderCache(args.directory)
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Long-running local render daemon.
+
+Keeps Pango/cairo imported, the preferred fonts resolved and the font map
+warm, then renders covers on request so callers skip the cold start.
+
+Endpoints (JSON over HTTP, on localhost TCP or a Unix socket):
+  GET  /health  -> fonts in use, uptime and render count
+  POST /render  -> render one cover
+
+A render request carries the engine fields (see ENGINE_FIELDS: cover, output,
+width, height, spine_width and the engine options) plus any add_text
+parameter. A "template" (layout_template.py JSON) may stand in for width,
+height and spine_width; loaded templates and their masks stay warm too.
+Colors may be "#rrggbb" strings or [r, g, b] lists. Omitted add_text
+parameters fall back to the same professional defaults as the CLI.
+
+With --render_cache, finished covers are kept on disk keyed by the art and
+every parameter (see render_cache.py); a repeated request is answered with a
+copy of the stored file, and /health includes the cache's hit/miss report.
+
+Requests are handled one at a time; run one daemon per core for parallelism.
+"""
+import argparse
+import inspect
+import json
+import os
+import socketserver
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from jobs import (JOB_DEFAULTS, PRO_TEXT_STYLE, TEMPLATE_FIELDS, pick_fonts, hex_to_rgb, validate_job,
+                  output_compositor)
+from layout_engine import CoverLayoutEngine
+from layout_template import load_template
+from output_profiles import extension_error
+from render_cache import RenderCache
+from text_renderer import render_text
+
+# Engine fields that never change the output (left out of render cache keys)
+UNCACHED_ENGINE_FIELDS = ("cover", "output", "ingest_cache", "parallel")
+ENGINE_FIELDS = ("cover", "output", "width", "height", "spine_width", "debug", "compositor", "low_memory",
+                 "mirror_bleed", "ingest_cache", "output_profile", "preview_dpi", "blur", "parallel", "template")
+TEXT_PARAMS = [p for p in inspect.signature(CoverLayoutEngine.add_text).parameters if p != "self"]
+COLOR_PARAMS = ("title_color", "desc_color")
+
+
+class RenderService:
+    """Warm state shared by all requests: resolved fonts and counters."""
+
+    def __init__(self, render_cache=None):
+        self.started = time.time()
+        self.renders = 0
+        self.cache = render_cache
+        self.title_font, self.body_font = pick_fonts()
+        # Load the font map and both faces once so the first request is warm too
+        render_text("Warm up", self.title_font, 12, (0, 0, 0), (64, 32), bold=True)
+        render_text("Warm up", self.body_font, 12, (0, 0, 0), (64, 32))
+
+    def health(self):
+        return {
+            "status": "ok",
+            "title_font": self.title_font,
+            "body_font": self.body_font,
+            "uptime": round(time.time() - self.started, 1),
+            "renders": self.renders,
+            "render_cache": self.cache.report() if self.cache else None,
+        }
+
+    def text_kwargs(self, request: dict):
+        """Build add_text keyword arguments from a request, filling defaults."""
+        unknown = [k for k in request if k not in ENGINE_FIELDS and k not in TEXT_PARAMS]
+        if unknown:
+            raise ValueError(f"❌ ERROR: Unknown field(s): {', '.join(sorted(unknown))}.")
+        missing = [k for k in ("cover", "width", "height", "spine_width", "title", "description")
+                   if k not in request]
+        if missing:
+            raise ValueError(f"❌ ERROR: Missing required field(s): {', '.join(missing)}.")
+
+        kwargs = {
+            "author": JOB_DEFAULTS["author"],
+            "font_family": self.title_font,
+            "body_font": self.body_font,
+            "title_font_size": JOB_DEFAULTS["title_size"],
+            "desc_font_size": JOB_DEFAULTS["desc_size"],
+            "spine_font_size": JOB_DEFAULTS["spine_size"],
+            "title_color": JOB_DEFAULTS["title_color"],
+            "desc_color": JOB_DEFAULTS["desc_color"],
+            **PRO_TEXT_STYLE,
+        }
+        kwargs.update({k: v for k, v in request.items() if k in TEXT_PARAMS})
+        for key in COLOR_PARAMS:
+            value = kwargs[key]
+            kwargs[key] = hex_to_rgb(value) if isinstance(value, str) else tuple(value)
+
+        validate_job({"title": kwargs["title"], "description": kwargs["description"],
+                      "author": kwargs["author"]})
+        return kwargs
+
+    def render(self, request: dict):
+        template = load_template(request["template"]) if request.get("template") else None
+        if template is not None:
+            request = {**dict(zip(TEMPLATE_FIELDS, template.size)), **request}
+        kwargs = self.text_kwargs(request)
+        output = request.get("output", JOB_DEFAULTS["output"])
+        profile = request.get("output_profile") or None
+        if profile and not output.lower().endswith(".pdf"):
+            mismatch = extension_error(profile, output)
+            if mismatch:
+                raise ValueError(f"❌ ERROR: {mismatch}")
+        start = time.perf_counter()
+        cache_key = None
+        if self.cache is not None:
+            params = {k: v for k, v in request.items() if k in ENGINE_FIELDS and k not in UNCACHED_ENGINE_FIELDS}
+            params.update(kwargs)
+            if template is not None:
+                params["template"] = template.to_dict()  # its contents, not the path
+            cache_key = self.cache.key_for(request["cover"], output, params,
+                                           (kwargs["font_family"], kwargs["body_font"]))
+            if self.cache.fetch(cache_key, output):
+                return {"status": "ok", "output": output, "seconds": round(time.perf_counter() - start, 4),
+                        "peak_rss_mb": None, "cached": True}
+        engine = CoverLayoutEngine(request["cover"], int(request["width"]), int(request["height"]),
+                                   int(request["spine_width"]), debug=bool(request.get("debug", False)),
+                                   compositor=output_compositor(output, request.get("compositor",
+                                                                                    JOB_DEFAULTS["compositor"])),
+                                   low_memory=bool(request.get("low_memory", False)),
+                                   mirror_bleed=bool(request.get("mirror_bleed", False)),
+                                   cache_dir=request.get("ingest_cache") or None,
+                                   preview_dpi=int(request.get("preview_dpi") or 0) or None,
+                                   blur=request.get("blur") or None,
+                                   parallel=bool(request.get("parallel", False)), template=template)
+        engine.add_text(**kwargs)
+        engine.save(output, profile=profile)
+        self.renders += 1
+        if cache_key:
+            self.cache.store(cache_key, output)
+        return {"status": "ok", "output": output, "seconds": round(time.perf_counter() - start, 4),
+                "peak_rss_mb": engine.peak_rss_mb, "cached": False}
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = "FBNPCoverEngine"
+
+    def _reply(self, code: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, self.server.service.health())
+        else:
+            self._reply(404, {"status": "error", "error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/render":
+            self._reply(404, {"status": "error", "error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("❌ ERROR: Request body must be a JSON object.")
+        except ValueError as e:
+            self._reply(400, {"status": "error", "error": str(e)})
+            return
+        try:
+            self._reply(200, self.server.service.render(request))
+        except (ValueError, TypeError, FileNotFoundError) as e:
+            self._reply(400, {"status": "error", "error": str(e)})
+        except Exception as e:
+            self._reply(500, {"status": "error", "error": f"{type(e).__name__}: {e}"})
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) pair
+        return self.client_address[0] if self.client_address else "unix"
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+
+
+def serve(host="127.0.0.1", port=8765, socket_path=None, render_cache=None, render_cache_mb=2048):
+    service = RenderService(RenderCache(render_cache, render_cache_mb) if render_cache else None)
+    if socket_path:
+        server = UnixHTTPServer(socket_path, RenderHandler)
+        where = f"unix:{socket_path}"
+    else:
+        server = HTTPServer((host, port), RenderHandler)
+        where = f"http://{host}:{port}"
+    server.service = service
+
+    print(f"🚀 Render daemon listening on {where}")
+    print(f"   ✔ Title Font: {service.title_font}")
+    print(f"   ✔ Body Font:  {service.body_font}")
+    if service.cache:
+        print(f"   ✔ Render cache: {service.cache.directory}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FBNP Cover render daemon")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind address (TCP mode)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (TCP mode)")
+    parser.add_argument("--socket", type=str, default=None, help="Serve on this Unix socket instead of TCP")
+    parser.add_argument("--render_cache", type=str, default=None,
+                        help="Directory of finished covers; repeated requests are copied, not rendered")
+    parser.add_argument("--render_cache_mb", type=int, default=JOB_DEFAULTS["render_cache_mb"],
+                        help="Render cache size cap (least recently used covers are evicted)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.socket, args.render_cache, args.render_cache_mb)
+
+
+if __name__ == "__main__":
+    main()
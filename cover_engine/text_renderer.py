@@ -1,4 +1,6 @@
-import subprocess
+import math
+import threading
+from functools import lru_cache
 import gi
 
 gi.require_version("Pango", "1.0")
@@ -6,17 +8,81 @@ gi.require_version("PangoCairo", "1.0")
 from gi.repository import Pango, PangoCairo
 import cairo
 from PIL import Image
+from font_index import verify_font_available  # noqa: F401 (kept importable from here)
+from profiler import stage
 
+SHADOW_OFFSET = (2, 2)  # px, down and right of the text
 
-# ===== Font Verification =====
-def verify_font_available(font_family: str):
+# ===== Reusable Pango state =====
+class TextContext:
     """
-    Check if the given font family is available on the system via fontconfig.
-    Raises ValueError if not found.
+    Pango objects reused across render_text / draw_text / measure_text calls.
+
+    Each thread gets its own Pango contexts and layouts (one for drawing,
+    one for measuring) on its default font map, since Pango objects must not
+    be used from two threads at once; font descriptions and attribute lists
+    are cached per thread too. One TextContext can therefore be shared by
+    any number of worker threads, and a long-lived worker only pays for font
+    setup once per thread instead of once per text block.
     """
-    result = subprocess.run(["fc-list", font_family], capture_output=True, text=True)
-    if not result.stdout.strip():
-        raise ValueError(f"❌ Font '{font_family}' is not installed. Please install it and run again.")
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _state(self):
+        state = getattr(self._local, "state", None)
+        if state is None:
+            font_map = PangoCairo.FontMap.get_default()
+            state = self._local.state = {
+                "draw": Pango.Layout.new(font_map.create_context()),
+                "measure": Pango.Layout.new(font_map.create_context()),
+                "fonts": {},
+                "attrs": {},
+            }
+        return state
+
+    def draw_layout(self, ctx: cairo.Context):
+        """This thread's drawing layout, matched to ctx's transform and font options."""
+        layout = self._state()["draw"]
+        PangoCairo.update_layout(ctx, layout)
+        return layout
+
+    def measure_layout(self):
+        """This thread's layout for measuring without a surface."""
+        return self._state()["measure"]
+
+    def font_description(self, font_family: str, font_size: int, bold=False, italic=False):
+        fonts = self._state()["fonts"]
+        key = (font_family, font_size, bold, italic)
+        desc = fonts.get(key)
+        if desc is None:
+            desc = Pango.FontDescription()
+            desc.set_family(font_family)
+            desc.set_size(font_size * Pango.SCALE)
+            if bold:
+                desc.set_weight(Pango.Weight.BOLD)
+            if italic:
+                desc.set_style(Pango.Style.ITALIC)
+            fonts[key] = desc
+        return desc
+
+    def attr_list(self, letter_spacing: float):
+        attrs_cache = self._state()["attrs"]
+        attrs = attrs_cache.get(letter_spacing)
+        if attrs is None:
+            attrs = Pango.AttrList()
+            if letter_spacing > 0:
+                attrs.insert(Pango.attr_letter_spacing_new(int(letter_spacing * Pango.SCALE)))
+            attrs_cache[letter_spacing] = attrs
+        return attrs
+
+
+_default_context = TextContext()
+
+
+def get_text_context():
+    """The process-wide TextContext used when none is passed explicitly."""
+    return _default_context
 
 
 # ===== Render Text with Advanced Styling =====
@@ -40,6 +106,11 @@ def render_text(
     small_caps: bool = False,
     justify: bool = False,
     padding_px: int = 12,
+    scale: float = 1.0,
+    profiler=None,
+    text_context=None,
+    angle: float = 0,
+    panel_opacity: float = None,
 ):
     """
     Draw styled, wrapped text into a transparent RGBA image.
@@ -52,11 +123,185 @@ def render_text(
       - Optional gradient or semi-transparent rounded panel behind text
       - Optional soft shadow
       - Letter spacing, small-caps simulation
-      - Rotation for spine text
+      - Rotation (spine text), drawn rotated rather than rotated afterwards
+
+    panel_opacity: opacity of the background panel (default 0.85 for
+              gradient panels, 0.78 for flat ones)
+    angle:    counter-clockwise rotation in degrees; the image is expanded to
+              the rotated box like PIL's rotate(angle, expand=True).
+              rotated=True is shorthand for angle=90.
+    scale:    render the same layout at this fraction of its size (previews);
+              box, font size and paddings stay in full-size units, so lines
+              wrap exactly as they do at scale 1
+    profiler: optional profiler.StageProfiler; records the surface, draw and
+              convert steps as stages.
+    text_context: TextContext to draw with (default: get_text_context())
+    """
+    if rotated:
+        angle = 90
+    width, height = _output_size(box_size, angle, scale)
+    with stage(profiler, "surface"):
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        ctx = cairo.Context(surface)
+        if scale != 1:
+            ctx.scale(scale, scale)
+        if angle % 360:
+            ctx.transform(rotation_matrix(box_size, angle))
+
+    with stage(profiler, "draw"):
+        draw_text(
+            ctx, text, font_family, font_size, color, box_size,
+            align=align, valign=valign, spacing=spacing, bold=bold, italic=italic,
+            add_bg=add_bg, gradient_bg=gradient_bg, rounded_bg=rounded_bg,
+            letter_spacing=letter_spacing, text_shadow=text_shadow,
+            small_caps=small_caps, justify=justify, padding_px=padding_px,
+            text_context=text_context, panel_opacity=panel_opacity,
+        )
+        surface.flush()
+
+    # Convert to PIL
+    with stage(profiler, "convert"):
+        buf = surface.get_data()
+        img = Image.frombuffer("RGBA", (width, height), buf, "raw", "BGRa", 0, 1)  # cairo data is premultiplied
+
+    return img
+
+
+def render_text_strip(
+    text: str,
+    font_family: str,
+    font_size: int,
+    color: tuple,
+    box_size: tuple,
+    angle: float = 90,
+    scale: float = 1.0,
+    profiler=None,
+    text_context=None,
+    **style,
+):
+    """
+    render_text for blocks without a background panel, such as the spine:
+    the layout is measured first and only the strip its ink (and shadow) can
+    touch is allocated, instead of the whole, mostly empty box.
+
+    Returns (image, (dx, dy)): the strip and its offset in output px from the
+    top-left corner of the full (rotated, scaled) block.
+    """
+    if style.get("add_bg") or style.get("gradient_bg"):
+        raise ValueError("render_text_strip only draws text without a background panel.")
+    text_context = text_context or _default_context
+    matrix = rotation_matrix(box_size, angle)
+    full_w, full_h = _output_size(box_size, angle, scale)
+
+    with stage(profiler, "measure"):
+        probe = cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1))
+        probe.scale(scale, scale)
+        probe.transform(matrix)
+        x1, y1, x2, y2 = _text_bounds(probe, text, font_family, font_size, box_size,
+                                      text_context=text_context, **style)
+        corners = [probe.user_to_device(x, y) for x, y in ((x1, y1), (x2, y1), (x1, y2), (x2, y2))]
+        # One extra px for antialiasing at the edges
+        left = max(0, math.floor(min(x for x, _ in corners)) - 1)
+        top = max(0, math.floor(min(y for _, y in corners)) - 1)
+        right = min(full_w, math.ceil(max(x for x, _ in corners)) + 1)
+        bottom = min(full_h, math.ceil(max(y for _, y in corners)) + 1)
+    if right <= left or bottom <= top:
+        return Image.new("RGBA", (1, 1)), (0, 0)
+
+    with stage(profiler, "surface"):
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, right - left, bottom - top)
+        ctx = cairo.Context(surface)
+        ctx.translate(-left, -top)
+        ctx.scale(scale, scale)
+        ctx.transform(matrix)
+
+    with stage(profiler, "draw"):
+        draw_text(ctx, text, font_family, font_size, color, box_size, text_context=text_context, **style)
+        surface.flush()
+
+    with stage(profiler, "convert"):
+        img = Image.frombuffer("RGBA", (right - left, bottom - top), surface.get_data(), "raw", "BGRa", 0, 1)
+
+    return img, (left, top)
+
+
+# ===== Rotation =====
+def rotated_size(box_size: tuple, angle: float):
+    """(width, height) of a box rotated by `angle` degrees, expanded to hold all of it."""
+    width, height = box_size
+    angle %= 360
+    if angle in (0, 180):
+        return width, height
+    if angle in (90, 270):
+        return height, width
+    rad = math.radians(angle)
+    cos, sin = abs(math.cos(rad)), abs(math.sin(rad))
+    return width * cos + height * sin, width * sin + height * cos
+
+
+def rotation_matrix(box_size: tuple, angle: float):
+    """
+    cairo matrix mapping the box (0, 0, *box_size) rotated counter-clockwise by
+    `angle` degrees into (0, 0, *rotated_size(box_size, angle)), like PIL's
+    rotate(angle, expand=True). Quarter turns are exact (no trigonometry).
+    """
+    width, height = box_size
+    angle %= 360
+    if angle == 0:
+        return cairo.Matrix()
+    if angle == 90:
+        return cairo.Matrix(0, -1, 1, 0, 0, width)
+    if angle == 180:
+        return cairo.Matrix(-1, 0, 0, -1, width, height)
+    if angle == 270:
+        return cairo.Matrix(0, 1, -1, 0, height, 0)
+    out_w, out_h = rotated_size(box_size, angle)
+    # Center the box on the origin, rotate (y points down), then center it in the output
+    matrix = cairo.Matrix(x0=-width / 2, y0=-height / 2)
+    matrix = matrix.multiply(cairo.Matrix.init_rotate(-math.radians(angle)))
+    return matrix.multiply(cairo.Matrix(x0=out_w / 2, y0=out_h / 2))
+
+
+def _output_size(box_size: tuple, angle: float, scale: float):
+    """Pixel size of a rotated, scaled block (quarter turns round like unrotated boxes)."""
+    width, height = rotated_size(box_size, angle)
+    if angle % 90 == 0:
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    return max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))
+
+
+def draw_text(
+    ctx: cairo.Context,
+    text: str,
+    font_family: str,
+    font_size: int,
+    color: tuple,
+    box_size: tuple,
+    align: str = "left",
+    valign: str = "top",
+    spacing: int = 0,
+    bold: bool = False,
+    italic: bool = False,
+    add_bg: bool = False,
+    gradient_bg: bool = False,
+    rounded_bg: bool = True,
+    letter_spacing: float = 0,
+    text_shadow: bool = True,
+    small_caps: bool = False,
+    justify: bool = False,
+    padding_px: int = 12,
+    text_context=None,
+    panel_opacity: float = None,
+):
+    """
+    Draw the styled text block into the box (0, 0, *box_size) of an existing
+    cairo context. The caller positions/rotates the box with the context's
+    transform; drawing is clipped to the box like a standalone render_text.
     """
     width, height = box_size
-    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
-    ctx = cairo.Context(surface)
+    ctx.save()
+    ctx.rectangle(0, 0, width, height)
+    ctx.clip()
 
     # --- Background panel (improves readability on busy art) ---
     if gradient_bg or add_bg:
@@ -72,21 +317,131 @@ def render_text(
         if gradient_bg:
             grad = cairo.LinearGradient(0, panel_y, 0, panel_y + panel_h)
             # subtle top brighter -> bottom a hair darker
-            grad.add_color_stop_rgba(0, 1, 1, 1, 0.85)
-            grad.add_color_stop_rgba(1, 0.95, 0.95, 0.95, 0.85)
+            alpha = 0.85 if panel_opacity is None else panel_opacity
+            grad.add_color_stop_rgba(0, 1, 1, 1, alpha)
+            grad.add_color_stop_rgba(1, 0.95, 0.95, 0.95, alpha)
             ctx.set_source(grad)
         else:
-            ctx.set_source_rgba(1, 1, 1, 0.78)
+            ctx.set_source_rgba(1, 1, 1, 0.78 if panel_opacity is None else panel_opacity)
 
         ctx.fill()
 
-    # --- Pango layout ---
-    layout = PangoCairo.create_layout(ctx)
+    layout, x_offset, y_offset = _place_layout(
+        ctx, text, font_family, font_size, box_size,
+        align=align, valign=valign, spacing=spacing, bold=bold, italic=italic,
+        letter_spacing=letter_spacing, small_caps=small_caps,
+        justify=justify, padding_px=padding_px, text_context=text_context,
+    )
+
+    # --- Soft shadow for legibility ---
+    if text_shadow:
+        shadow_dx, shadow_dy = SHADOW_OFFSET
+        ctx.set_source_rgba(0, 0, 0, 0.45)
+        ctx.move_to(x_offset + shadow_dx, y_offset + shadow_dy)
+        PangoCairo.show_layout(ctx, layout)
+
+    # --- Main text ---
+    r, g, b = color
+    ctx.set_source_rgba(r / 255.0, g / 255.0, b / 255.0, 1.0)
+    ctx.move_to(x_offset, y_offset)
+    PangoCairo.show_layout(ctx, layout)
+
+    ctx.restore()
+
+
+def _place_layout(
+    ctx: cairo.Context,
+    text: str,
+    font_family: str,
+    font_size: int,
+    box_size: tuple,
+    align: str = "left",
+    valign: str = "top",
+    spacing: int = 0,
+    bold: bool = False,
+    italic: bool = False,
+    letter_spacing: float = 0,
+    small_caps: bool = False,
+    justify: bool = False,
+    padding_px: int = 12,
+    text_context=None,
+):
+    """Configure this thread's drawing layout for ctx; returns (layout, x_offset, y_offset)."""
+    width, height = box_size
+    # --- Pango layout (reused per thread, see TextContext) ---
+    text_context = text_context or _default_context
+    layout = text_context.draw_layout(ctx)
+    _configure_layout(
+        layout, text, font_family, font_size, width,
+        align=align, spacing=spacing, bold=bold, italic=italic,
+        letter_spacing=letter_spacing, small_caps=small_caps,
+        justify=justify, padding_px=padding_px, text_context=text_context,
+    )
+
+    # Measure logical extents
+    _ink_rect, logical_rect = layout.get_extents()
+    text_h = logical_rect.height // Pango.SCALE
 
+    # Vertical alignment (compute Y offset)
+    if valign == "middle":
+        y_offset = max((height - text_h) // 2, 0)
+    elif valign == "bottom":
+        y_offset = max(height - text_h, 0)
+    else:
+        y_offset = padding_px  # top: give it the same padding
+
+    # X offset (padding & alignment)
+    x_offset = padding_px
+    return layout, x_offset, y_offset
+
+
+def _text_bounds(ctx: cairo.Context, text: str, font_family: str, font_size: int, box_size: tuple,
+                 text_shadow: bool = True, add_bg: bool = False, gradient_bg: bool = False,
+                 rounded_bg: bool = True, panel_opacity: float = None, **layout_kwargs):
+    """
+    (x1, y1, x2, y2) in box units of everything draw_text paints for a block
+    without a panel: the ink and logical extents, plus the shadow, clipped to the box.
+    """
+    layout, x_offset, y_offset = _place_layout(ctx, text, font_family, font_size, box_size, **layout_kwargs)
+    ink, logical = layout.get_pixel_extents()
+    x1 = min(ink.x, logical.x)
+    y1 = min(ink.y, logical.y)
+    x2 = max(ink.x + ink.width, logical.x + logical.width)
+    y2 = max(ink.y + ink.height, logical.y + logical.height)
+    if text_shadow:
+        x2 += SHADOW_OFFSET[0]
+        y2 += SHADOW_OFFSET[1]
+    width, height = box_size
+    return (max(0, x_offset + x1), max(0, y_offset + y1),
+            min(width, x_offset + x2), min(height, y_offset + y2))
+
+
+def _configure_layout(
+    layout,
+    text: str,
+    font_family: str,
+    font_size: int,
+    width: int,
+    align: str = "left",
+    spacing: int = 0,
+    bold: bool = False,
+    italic: bool = False,
+    letter_spacing: float = 0,
+    small_caps: bool = False,
+    justify: bool = False,
+    padding_px: int = 12,
+    wrap=Pango.WrapMode.WORD_CHAR,
+    text_context=None,
+):
+    """
+    Apply text, font and paragraph settings shared by drawing and measuring.
+    Every setting is applied on each call, since layouts are reused.
+    """
+    text_context = text_context or _default_context
     # Keep text inside a padded area for nicer margins
     text_area_w = max(0, width - 2 * padding_px)
     layout.set_width(text_area_w * Pango.SCALE)
-    layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+    layout.set_wrap(wrap)
 
     if small_caps:
         text = text.upper()
@@ -96,24 +451,13 @@ def render_text(
     layout.set_text(text, -1)
 
     # Font
-    font_desc = Pango.FontDescription()
-    font_desc.set_family(font_family)
-    font_desc.set_size(font_size * Pango.SCALE)
-    if bold:
-        font_desc.set_weight(Pango.Weight.BOLD)
-    if italic:
-        font_desc.set_style(Pango.Style.ITALIC)
-    layout.set_font_description(font_desc)
-
-    # Line spacing
-    if spacing > 0:
-        layout.set_spacing(int(spacing * Pango.SCALE))
+    layout.set_font_description(text_context.font_description(font_family, font_size, bold, italic))
+
+    # Line spacing (reset when unused, the layout may carry the previous block's)
+    layout.set_spacing(int(spacing * Pango.SCALE) if spacing > 0 else 0)
 
     # Letter spacing
-    attrs = Pango.AttrList()
-    if letter_spacing > 0:
-        attrs.insert(Pango.attr_letter_spacing_new(int(letter_spacing * Pango.SCALE)))
-    layout.set_attributes(attrs)
+    layout.set_attributes(text_context.attr_list(letter_spacing))
 
     # Horizontal alignment
     if align == "center":
@@ -126,43 +470,99 @@ def render_text(
     # Justify mostly for description/body text
     layout.set_justify(bool(justify and align == "left"))
 
-    # Measure logical extents
-    ink_rect, logical_rect = layout.get_extents()
-    text_w = logical_rect.width // Pango.SCALE
-    text_h = logical_rect.height // Pango.SCALE
 
-    # Vertical alignment (compute Y offset)
-    if valign == "middle":
-        y_offset = max((height - text_h) // 2, 0)
-    elif valign == "bottom":
-        y_offset = max(height - text_h, 0)
-    else:
-        y_offset = padding_px  # top: give it the same padding
+# ===== Measurement-only layouts (no surface, no rasterization) =====
+@lru_cache(maxsize=4096)
+def measure_text(
+    text: str,
+    font_family: str,
+    font_size: int,
+    width: int,
+    letter_spacing: float = 0,
+    spacing: int = 0,
+    bold: bool = False,
+    italic: bool = False,
+    small_caps: bool = False,
+    justify: bool = False,
+    padding_px: int = 12,
+    break_words: bool = True,
+):
+    """
+    Return the (width, height) in px that render_text would lay the text out at
+    inside a box `width` px wide. Results are memoized.
 
-    # X offset (padding & alignment)
-    x_offset = padding_px
+    With break_words=False words are never split, so a word wider than the box
+    shows up as a width larger than the text area.
+    """
+    layout = _default_context.measure_layout()
+    _configure_layout(
+        layout, text, font_family, font_size, width,
+        spacing=spacing, bold=bold, italic=italic,
+        letter_spacing=letter_spacing, small_caps=small_caps,
+        justify=justify, padding_px=padding_px,
+        wrap=Pango.WrapMode.WORD_CHAR if break_words else Pango.WrapMode.WORD,
+    )
+    _ink_rect, logical_rect = layout.get_extents()
+    return logical_rect.width // Pango.SCALE, logical_rect.height // Pango.SCALE
 
-    # --- Soft shadow for legibility ---
-    if text_shadow:
-        shadow_dx, shadow_dy = 2, 2
-        ctx.set_source_rgba(0, 0, 0, 0.45)
-        ctx.move_to(x_offset + shadow_dx, y_offset + shadow_dy)
-        PangoCairo.show_layout(ctx, layout)
 
-    # --- Main text ---
-    r, g, b = color
-    ctx.set_source_rgba(r / 255.0, g / 255.0, b / 255.0, 1.0)
-    ctx.move_to(x_offset, y_offset)
-    PangoCairo.show_layout(ctx, layout)
+def fit_font_size(text: str, font_family: str, box_size: tuple, min_size: int, max_size: int,
+                  padding_px: int = 12, **measure_kwargs):
+    """
+    Binary-search the largest font size in [min_size, max_size] whose layout
+    fits inside box_size (padding included) without splitting words.
+    Returns min_size when nothing fits.
+    """
+    width, height = box_size
+    avail_w = max(0, width - 2 * padding_px)
+    avail_h = max(0, height - 2 * padding_px)
 
-    # Convert to PIL
-    buf = surface.get_data()
-    img = Image.frombuffer("RGBA", (width, height), buf, "raw", "BGRA", 0, 1)
+    best = min_size
+    lo, hi = min_size, max_size
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        text_w, text_h = measure_text(text, font_family, mid, width, padding_px=padding_px,
+                                      break_words=False, **measure_kwargs)
+        if text_w <= avail_w and text_h <= avail_h:
+            best = mid
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    return best
 
-    if rotated:
-        img = img.rotate(90, expand=True)
 
-    return img
+# ===== cairo <-> PIL =====
+def image_to_surface(img: Image.Image):
+    """
+    Copy a PIL RGBA (or RGB) image into a new cairo ImageSurface.
+    Rows are converted in strips so no second full-size buffer is allocated.
+    """
+    width, height = img.size
+    if img.mode == "RGB":
+        fmt, rawmode = cairo.FORMAT_RGB24, "BGRX"
+    else:
+        img = img if img.mode == "RGBA" else img.convert("RGBA")
+        fmt, rawmode = cairo.FORMAT_ARGB32, "BGRa"  # cairo wants premultiplied alpha
+
+    surface = cairo.ImageSurface(fmt, width, height)
+    stride = surface.get_stride()
+    data = surface.get_data()
+    step = 256
+    for y in range(0, height, step):
+        rows = img.crop((0, y, width, min(height, y + step))).tobytes("raw", rawmode)
+        data[y * stride:y * stride + len(rows)] = rows
+    surface.mark_dirty()
+    return surface
+
+
+def surface_to_image(surface: cairo.ImageSurface):
+    """Copy a cairo ImageSurface back into a PIL image (RGB for RGB24 surfaces, else RGBA)."""
+    surface.flush()
+    size = (surface.get_width(), surface.get_height())
+    stride = surface.get_stride()
+    if surface.get_format() == cairo.FORMAT_RGB24:
+        return Image.frombuffer("RGB", size, surface.get_data(), "raw", "BGRX", stride, 1)
+    return Image.frombuffer("RGBA", size, surface.get_data(), "raw", "BGRa", stride, 1)
 
 
 def _rounded_rect(ctx: cairo.Context, x: int, y: int, w: int, h: int, r: int):
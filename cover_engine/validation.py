@@ -0,0 +1,127 @@
+"""
+Validation-only fast path: check a cover job without rendering it.
+
+    from validation import check_job
+    report = check_job({"cover": "art.png", "title": "...", "description": "...",
+                        "width": 5175, "height": 3375, "spine_width": 375})
+    if not report["valid"]:
+        print(report["errors"])
+
+Text limits, colors, dimensions and option names are checked in pure Python;
+nothing here imports PIL, cairo or Pango, so a rejected job fails in
+milliseconds. check_fit=True also measures every text block with Pango at its
+requested size (this loads the text stack) and warns about blocks that would
+overflow their box.
+"""
+import os
+import re
+
+from config import DPI, COMPOSITORS, BLUR_MODES
+from geometry import safe_zones
+from jobs import normalize_job, check_limits
+from output_profiles import OUTPUT_PROFILES, extension_error
+
+HEX_COLOR = re.compile(r"^#?[0-9a-fA-F]{6}$")
+COLOR_FIELDS = ("title_color", "desc_color")
+SIZE_FIELDS = ("title_size", "desc_size", "spine_size")
+
+
+def color_errors(job: dict):
+    return [f"❌ ERROR: Field '{key}' must be a hex color like #1A2B3C (got {job[key]!r})."
+            for key in COLOR_FIELDS if not HEX_COLOR.match(job[key])]
+
+
+def dimension_errors(job: dict):
+    errors = []
+    for key in ("width", "height", "spine_width") + SIZE_FIELDS:
+        if job[key] <= 0:
+            errors.append(f"❌ ERROR: Field '{key}' must be positive (got {job[key]}).")
+    if errors:
+        return errors
+    if job["spine_width"] >= job["width"]:
+        errors.append(f"❌ ERROR: Spine width ({job['spine_width']} px) must be less than the cover width "
+                      f"({job['width']} px).")
+        return errors
+    zones = safe_zones(job["width"], job["height"], job["spine_width"])
+    if zones["front"][2] <= 0 or zones["front"][3] <= 0:
+        errors.append(f"❌ ERROR: {job['width']}x{job['height']} px with a {job['spine_width']} px spine leaves "
+                      f"no safe area for text at {DPI} DPI.")
+    if zones["spine_box"][0] <= 0:
+        errors.append(f"❌ ERROR: Spine width ({job['spine_width']} px) is too narrow for spine text.")
+    if not 0 <= job["preview_dpi"] <= DPI:
+        errors.append(f"❌ ERROR: Field 'preview_dpi' must be between 1 and {DPI}, or 0 for print "
+                      f"resolution (got {job['preview_dpi']}).")
+    return errors
+
+
+def option_errors(job: dict):
+    errors = []
+    if job["compositor"] not in COMPOSITORS:
+        errors.append(f"❌ ERROR: Unknown compositor '{job['compositor']}' (use one of {COMPOSITORS}).")
+    if job["blur"] and job["blur"] not in BLUR_MODES:
+        errors.append(f"❌ ERROR: Unknown blur mode '{job['blur']}' (use one of {BLUR_MODES}).")
+    if job["output_profile"] and job["output_profile"] not in OUTPUT_PROFILES:
+        errors.append(f"❌ ERROR: Unknown output profile '{job['output_profile']}' "
+                      f"(use one of {tuple(OUTPUT_PROFILES)}).")
+    elif job["output_profile"] and not job["output"].lower().endswith(".pdf"):
+        mismatch = extension_error(job["output_profile"], job["output"])
+        if mismatch:
+            errors.append(f"❌ ERROR: {mismatch}")
+    if job["render_cache"] and job["render_cache_mb"] <= 0:
+        errors.append(f"❌ ERROR: Field 'render_cache_mb' must be positive (got {job['render_cache_mb']}).")
+    return errors
+
+
+def fit_report(job: dict, main_title: str, subtitle: str, spine_text: str, fonts=None):
+    """Measure each text block at its job size; loads Pango (and picks fonts unless given)."""
+    from layout_engine import text_fit
+    from jobs import PRO_TEXT_STYLE, pick_fonts
+
+    title_font, body_font = fonts or pick_fonts()
+    return text_fit(main_title, subtitle, job["description"], spine_text, title_font, body_font,
+                    job["title_size"], job["desc_size"], job["spine_size"],
+                    job["width"], job["height"], job["spine_width"],
+                    letter_spacing=PRO_TEXT_STYLE["letter_spacing"],
+                    line_spacing=PRO_TEXT_STYLE["line_spacing"])
+
+
+def check_job(raw: dict, check_fit=False, fonts=None):
+    """
+    Validate a raw job (CLI arguments or a manifest row) without rendering.
+
+    Returns a report dict: valid, errors and warnings (lists of messages),
+    the split main_title / subtitle / spine_text, and with check_fit=True a
+    per-block "fit" dict (see layout_engine.text_fit). fonts is an optional
+    (title_font, body_font) pair for the fit check.
+    """
+    report = {"valid": False, "errors": [], "warnings": [], "main_title": None, "subtitle": None,
+              "spine_text": None, "fit": None}
+    try:
+        job = normalize_job(raw)
+    except ValueError as e:
+        report["errors"].append(str(e))
+        return report
+
+    errors, warnings = report["errors"], report["warnings"]
+    main_title, subtitle, spine_text, limit_errors = check_limits(job)
+    report.update(main_title=main_title, subtitle=subtitle, spine_text=spine_text)
+    errors += limit_errors
+    errors += color_errors(job)
+    errors += dimension_errors(job)
+    errors += option_errors(job)
+    if not os.path.isfile(job["cover"]):
+        errors.append(f"❌ ERROR: Cover image not found: {job['cover']}.")
+    output_dir = os.path.dirname(os.path.abspath(job["output"]))
+    if not os.path.isdir(output_dir):
+        warnings.append(f"⚠️ Output directory does not exist yet: {output_dir}.")
+
+    if check_fit and not errors:
+        report["fit"] = fit_report(job, main_title, subtitle, spine_text, fonts)
+        for name, block in report["fit"].items():
+            if not block["fits"] and not job["auto_fit"]:
+                warnings.append(f"⚠️ {name.capitalize()} overflows its box at {block['size']}pt "
+                                f"(fits at {block['max_size']}pt or smaller).")
+
+    report["valid"] = not errors
+    return report
+